@@ -1,18 +1,18 @@
 
 import json, os
-from datetime import datetime, timezone
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
 import streamlit as st
 
-from src.config import RSS_FEEDS, DEFAULT_LOOKBACK_DAYS, DEFAULT_MAX_ARTICLES, CALCULATORS
+from src.config import RSS_FEEDS, DEFAULT_LOOKBACK_DAYS, DEFAULT_MAX_ARTICLES, FETCH_WORKERS, ARTICLE_CACHE_MAX_ENTRIES, SERVE_URL
+from src.cache import ArticleCache
 from src.ingest import fetch_feed_entries
-from src.parse_article import fetch_and_parse
-from src.nlp_extract import extract_5w, entities_for_gematria, nlp as ensure_spacy
-from src.gematria import CALC_FUNCS
-from src.match import compute_values, find_matches
-from src.numerology import date_numerology
-from src.patterns import load_archetypes, archetype_hits, score_ritual_signature
-from src.astrology import basic_astrology
+from src.ledger import entry_fingerprint
+from src.nlp_extract import warm_up
+from src.pipeline import Pipeline
+from src.result_index import ResultIndex
+from src.result_model import CompactResult, expand
+from src.analytics import Corpus, summarize
 
 st.set_page_config(page_title="Daily Decode — News → Gematria → Patterns", page_icon="🔮", layout="wide")
 
@@ -39,6 +39,9 @@ st.sidebar.header("Settings")
 lookback = st.sidebar.slider("Look back (days)", 1, 7, value=DEFAULT_LOOKBACK_DAYS)
 max_articles = st.sidebar.slider("Max articles", 10, 100, value=DEFAULT_MAX_ARTICLES, step=10)
 rss_edit = st.sidebar.text_area("RSS feeds (one per line)", "\n".join(RSS_FEEDS), height=180)
+serve_url = st.sidebar.text_input("Decode server (optional)", SERVE_URL,
+                                  help="URL of a running `python -m src.serve`: its latest results are shown instead of decoding here "
+                                       "(its own feeds and look-back apply)").strip()
 
 st.sidebar.header("Filters")
 query = st.sidebar.text_input("Search (title/source/5W)", "")
@@ -48,104 +51,122 @@ min_score = st.sidebar.slider("Min ritual score", 0, 20, value=0)
 
 st.sidebar.header("Output")
 show_text = st.sidebar.checkbox("Show article text preview", value=False)
+page_size = st.sidebar.select_slider("Articles per page", options=[10, 25, 50, 100], value=25)
 
 @st.cache_resource(show_spinner=False)
 def ensure_model():
-    try:
-        ensure_spacy()
-        return True
-    except Exception:
-        import subprocess, sys
-        subprocess.run([sys.executable, "-m", "spacy", "download", "en_core_web_sm"], check=True)
-        ensure_spacy()
-        return True
-
-@st.cache_data(show_spinner=True, ttl=60*60*3)
-def run_decode(_feeds: List[str], days: int, max_n: int) -> List[Dict[str, Any]]:
-    entries = fetch_feed_entries(lookback_days=days, rss_feeds=_feeds)[:max_n]
-    arch = load_archetypes("database/archetypes.json")
-    with open("database/phrases.json","r",encoding="utf-8") as f:
-        base_phr = json.load(f)
-    db_vals = {k: {name: func(k) for name, func in CALC_FUNCS.items()} for k in base_phr.keys()}
-    results = []
-    for e in entries:
-        try:
-            parsed = fetch_and_parse(e['link'])
-        except Exception:
-            continue
-        title = parsed.get('title') or e['title']
-        text = parsed.get('text') or ''
-        published = parsed.get('published') or e.get('published')
-        five_w = extract_5w(text, title=title, ref_date_iso=published)
-        dt = datetime.now(timezone.utc)
-        if published:
-            try:
-                from dateutil import parser as dateutil_parser
-                dt = dateutil_parser.parse(published)
-                if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
-            except Exception:
-                pass
-        phrases = entities_for_gematria(title, text)
-        values_map = compute_values(phrases, CALCULATORS, CALC_FUNCS)
-        matches = find_matches(values_map, db_vals)
-        dnum = date_numerology(dt)
-        arch_hits = archetype_hits((title + "\\n" + text[:5000]), arch)
-        pat = score_ritual_signature(title, text, num_matches=len(matches), date_info=dnum)
-        pat['archetype_hits'] = arch_hits
-        astro = basic_astrology(dt)
-        results.append({
-            'title': title, 'link': e['link'], 'source': e.get('source'),
-            'published': published, 'authors': parsed.get('authors'),
-            'five_w': five_w, 'phrases': phrases, 'values': values_map,
-            'matches': matches, 'numerology': dnum, 'patterns': pat, 'astrology': astro,
-            'text': text[:2000]
-        })
-    return results
-
-ensure_model()
+    # loads (or first downloads) the spaCy model in the background; decoding waits on it only when it gets to NLP
+    return warm_up(install_missing=True)
+
+@st.cache_resource(show_spinner=False)
+def article_cache():
+    return ArticleCache()
+
+@st.cache_resource(show_spinner=False)
+def result_store() -> Dict[str, Tuple[str, Optional[CompactResult]]]:
+    # decoded articles shared by every rerun and session: link -> (entry fingerprint, compact result or None if it failed)
+    return {}
+
+@st.cache_data(show_spinner=False, ttl=60*30)
+def feed_entries(feeds: Tuple[str, ...], days: int) -> List[Dict[str, Any]]:
+    return fetch_feed_entries(lookback_days=days, rss_feeds=list(feeds))
+
+def run_decode(feeds: List[str], days: int, max_n: int) -> Tuple[List[CompactResult], Optional[Dict[str, Any]]]:
+    # only entries that are new (or whose title/date changed) get fetched and decoded; the rest come from the store
+    entries = feed_entries(tuple(feeds), days)[:max_n]
+    store = result_store()
+    todo = [e for e in entries if (hit := store.get(e["link"])) is None or hit[0] != entry_fingerprint(e)]
+    timings = None
+    if todo:
+        with st.spinner(f"Decoding {len(todo)} new article(s)…"):
+            pipe = Pipeline("database/phrases.json", "database/archetypes.json", workers=FETCH_WORKERS,
+                            cache=article_cache(), rss_feeds=feeds)
+            done = {e["link"]: CompactResult.from_dict(item) for e, item in pipe.run(todo, keep_text=2000)}
+            for e in todo: store[e["link"]] = (entry_fingerprint(e), done.get(e["link"]))
+            timings = pipe.timings()
+    results = [hit[1] for e in entries if (hit := store.get(e["link"])) and hit[1] is not None]
+    for link in list(store)[:max(0, len(store) - ARTICLE_CACHE_MAX_ENTRIES)]: store.pop(link, None)  # oldest first
+    return results, timings
+
+@st.cache_resource(show_spinner=False, ttl=15)
+def served_results(url: str, limit: int) -> List[CompactResult]:
+    # the server's newest results; kept for a few seconds so reruns (filters, paging) reuse the same objects
+    import requests
+    resp = requests.get(f"{url.rstrip('/')}/results", params={"limit": limit}, timeout=10); resp.raise_for_status()
+    return [CompactResult.from_dict(it) for it in resp.json()["results"]]
 
 feeds = [x.strip() for x in rss_edit.splitlines() if x.strip()]
 run = st.button("🔁 Run fresh decode")
 if run:
-    st.cache_data.clear()
-data = run_decode(feeds, lookback, max_articles)
-
-total = len(data)
-with_matches = sum(1 for d in data if d.get('matches'))
-avg_score = round(sum(d['patterns']['score'] for d in data)/total, 2) if total else 0
+    # re-poll the feeds and retry articles that failed last time; decoded articles are kept
+    feed_entries.clear(); served_results.clear()
+    store = result_store()
+    for link in [k for k, (_, item) in list(store.items()) if item is None]: store.pop(link, None)
+data, from_server = None, False
+if serve_url:
+    try:
+        data, timings, from_server = served_results(serve_url, max_articles), None, True
+    except Exception as ex:
+        st.warning(f"Decode server {serve_url} unavailable ({ex}); decoding here instead.")
+if data is None:
+    ensure_model()
+    data, timings = run_decode(feeds, lookback, max_articles)
+
+with st.sidebar.expander("Stage timings", expanded=False):
+    if timings is None:
+        st.caption("Decoded by the server (see its /status)." if from_server else "Every article came from the cache.")
+    else:
+        st.caption(f"Total {timings['total_wall_s']}s — bottleneck: {timings['bottleneck']}")
+        st.table([{'stage': k, **v} for k, v in timings['stages'].items()])
+
+def result_index(items: List[CompactResult]) -> ResultIndex:
+    # rebuilt only when the decoded set changes, not on every filter tweak
+    key = tuple(id(d) for d in items)
+    if st.session_state.get("index_key") != key:
+        st.session_state["index_key"], st.session_state["index"] = key, ResultIndex(items)
+    return st.session_state["index"]
+
+index = result_index(data)
+total = len(index)
 col1, col2, col3 = st.columns(3)
 with col1: st.markdown(f"<div class='metric-card'><h3>Articles</h3><div class='muted'>{total}</div></div>", unsafe_allow_html=True)
-with col2: st.markdown(f"<div class='metric-card'><h3>With matches</h3><div class='muted'>{with_matches}</div></div>", unsafe_allow_html=True)
-with col3: st.markdown(f"<div class='metric-card'><h3>Avg ritual score</h3><div class='muted'>{avg_score}</div></div>", unsafe_allow_html=True)
-
-def passes_filters(item):
-    if min_score and item['patterns']['score'] < min_score:
-        return False
-    if only_matches and not item['matches']:
-        return False
-    if number_filter:
-        if not any(str(m['value']) == str(number_filter) for m in item['matches']):
-            return False
-    if query:
-        fw = item['five_w']
-        hay = " ".join([
-            item.get('title') or '', item.get('source') or '',
-            *(fw.get('who') or []), *(fw.get('what') or []), *(fw.get('where') or []),
-            fw.get('why') or ''
-        ]).lower()
-        if query.lower() not in hay:
-            return False
-    return True
-
-filtered = [d for d in data if passes_filters(d)]
-st.markdown(f"**Showing {len(filtered)} of {total}**")
-
-for it in filtered:
+with col2: st.markdown(f"<div class='metric-card'><h3>With matches</h3><div class='muted'>{index.with_matches}</div></div>", unsafe_allow_html=True)
+with col3: st.markdown(f"<div class='metric-card'><h3>Avg ritual score</h3><div class='muted'>{index.avg_score}</div></div>", unsafe_allow_html=True)
+
+def corpus_summary(items: List[CompactResult]) -> Dict[str, Any]:
+    if st.session_state.get("summary_key") != st.session_state["index_key"]:
+        st.session_state["summary_key"], st.session_state["summary"] = st.session_state["index_key"], summarize(Corpus.from_items(expand(items)))
+    return st.session_state["summary"]
+
+with st.expander("Corpus analytics — frequent numbers, spikes, co-occurrences", expanded=False):
+    summary = corpus_summary(data)
+    cols = st.columns(3)
+    with cols[0]:
+        st.markdown("**Top values per calculator**")
+        st.table([{'calculator': c, 'value': lbl.split('=', 1)[1], 'articles': n} for c, hist in summary['values'].items() for lbl, n in hist[:5]])
+    with cols[1]:
+        st.markdown("**Headline numbers & archetypes**")
+        st.table([{'feature': lbl, 'articles': n} for lbl, n in summary['headline_numbers'] + summary['archetypes']])
+    with cols[2]:
+        st.markdown("**Co-occurring in the same article**")
+        st.table([{'a': a, 'b': b, 'articles': n} for a, b, n in summary['pairs']])
+    if summary['spikes']:
+        st.markdown(f"**Spikes on {summary['spikes'][0]['day']}** (vs. the other days' mean)")
+        st.table(summary['spikes'])
+
+filtered = index.filter(query=query, only_matches=only_matches, number=number_filter, min_score=min_score)
+pages = max(1, -(-len(filtered) // page_size))
+page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+start = (page - 1) * page_size
+st.markdown(f"**Showing {start + 1 if filtered else 0}–{min(start + page_size, len(filtered))} of {len(filtered)} matching ({total} total)**")
+
+for it in expand(filtered[start:start + page_size]):  # only the cards on screen are turned back into dicts
     st.markdown("<div class='article-card'>", unsafe_allow_html=True)
     cols = st.columns([0.8, 0.2])
     with cols[0]:
         st.markdown(f"### {it['title']}")
-        st.caption(f"{it.get('source') or '—'} • {it.get('published') or 'no date'}")
+        st.caption(f"{it.get('source') or '—'} • {it.get('published') or 'no date'}"
+                   + (f" • same story as {it['duplicate_of']}" if it.get('duplicate_of') else ""))
         fw = it['five_w']
         who = ', '.join(fw.get('who', [])) or '—'
         what = ', '.join(fw.get('what', [])) or '—'
@@ -167,7 +188,9 @@ for it in filtered:
         st.table(it['matches'][:10])
     else:
         st.caption("No exact numeric matches.")
-    if st.sidebar.checkbox("Show article text preview", key=f"txt_{hash(it['title'])}"):
+    if it.get('fuzzy_matches'):
+        st.markdown("**Fuzzy phrase matches:** " + ", ".join(f"{m['phrase']} ~ {m['db_phrase']} ({m['score']})" for m in it['fuzzy_matches'][:10]))
+    if show_text:
         with st.expander("Article text (preview)"):
             st.write(it.get('text') or "—")
     st.markdown(f"<a class='article-link' href='{it.get('link')}' target='_blank'>Open original source ↗</a>", unsafe_allow_html=True)
@@ -175,5 +198,8 @@ for it in filtered:
     st.divider()
 
 if filtered:
-    js = json.dumps(filtered, ensure_ascii=False, indent=2)
+    dl_key = (st.session_state["index_key"], query, only_matches, number_filter, min_score)
+    if st.session_state.get("download_key") != dl_key:
+        st.session_state["download_key"], st.session_state["download"] = dl_key, json.dumps(list(expand(filtered)), ensure_ascii=False, indent=2)
+    js = st.session_state["download"]
     st.download_button("⬇️ Download filtered JSON", js, file_name=f"decode-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json", mime="application/json")
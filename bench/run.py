@@ -0,0 +1,110 @@
+import argparse, json, platform, re, sys, time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Callable, List
+
+from src.config import CALCULATORS, FETCH_WORKERS
+from src.ingest import fetch_feed_entries
+from src.parse_article import fetch_many
+from src.nlp_extract import extract_5w, entities_for_gematria, analyze_articles, nlp
+from src.gematria import CALC_FUNCS
+from src.match import compute_values, find_matches
+from src.near_dup import NearDuplicates
+from src.build_db import load_phrase_db
+from src.patterns import load_archetypes, compile_archetypes, archetype_hits
+from src.pipeline import Pipeline
+from .server import FixtureServer
+
+HERE = Path(__file__).parent
+BASELINE = HERE / "baseline.json"
+DB, ARCHETYPES = "database/phrases.json", "database/archetypes.json"
+
+def _timed(out: Dict[str, Any], name: str, fn: Callable):
+    w0, c0 = time.perf_counter(), time.process_time()
+    result = fn()
+    out[name] = {"wall_s": round(time.perf_counter() - w0, 4), "cpu_s": round(time.process_time() - c0, 4)}
+    return result
+
+def bench_size(n: int, workers: int, with_nlp: bool, procs: int = 2) -> Dict[str, Any]:
+    t: Dict[str, Any] = {}
+    with FixtureServer(n) as srv:
+        entries = _timed(t, "fetch_feed_entries", lambda: fetch_feed_entries(lookback_days=1, rss_feeds=srv.feed_urls,
+                                                                             workers=workers, state_path=None))
+        links = [e["link"] for e in entries]
+        parsed = _timed(t, "fetch_and_parse", lambda: fetch_many(links, workers=workers, per_host=workers))
+        docs = [(p.get("title") or e["title"], p.get("text") or "", p.get("published")) for e, p in zip(entries, parsed) if p]
+        if with_nlp:
+            _timed(t, "extract_5w", lambda: [extract_5w(text, title=title, ref_date_iso=pub) for title, text, pub in docs])
+            _timed(t, "entities_for_gematria", lambda: [entities_for_gematria(title, text) for title, text, _ in docs])
+            phrases = [ph for _, ph in _timed(t, "analyze_articles", lambda: list(analyze_articles(docs)))]
+        else:
+            phrases = [re.findall(r"[A-Z][a-z]+(?: [A-Z][a-z]+)*", title + " " + text[:4000])[:20] for title, text, _ in docs]
+        db = load_phrase_db(DB)
+        values = _timed(t, "compute_values", lambda: [compute_values(ph, CALCULATORS, CALC_FUNCS) for ph in phrases])
+        _timed(t, "find_matches", lambda: [find_matches(v, db) for v in values])
+        dups = NearDuplicates()
+        _timed(t, "near_duplicates", lambda: [dups.check(i, title, text) for i, (title, text, _) in enumerate(docs)])
+        arch = compile_archetypes(load_archetypes(ARCHETYPES))
+        _timed(t, "archetype_hits", lambda: [archetype_hits(title + "\n" + text[:5000], arch) for title, text, _ in docs])
+        if with_nlp:
+            def end_to_end(procs: int):
+                # same per-host limit as the fetch stage above, and no feed state: the fixture feeds are throwaway
+                pipe = Pipeline(DB, ARCHETYPES, workers=workers, per_host=workers, rss_feeds=srv.feed_urls, feed_state=None,
+                                procs=procs)
+                return [item for _, item in pipe.run(pipe.feeds(1))]
+            single = _timed(t, "end_to_end", lambda: end_to_end(1))
+            if procs > 1:
+                # the process pool must give exactly the single-process output, duplicates and all
+                pooled = _timed(t, "end_to_end_pool", lambda: end_to_end(procs))
+                t["pool_output"] = {"procs": procs, "identical": pooled == single}
+        t["articles"] = {"feed_entries": len(entries), "parsed": len(docs)}
+    return t
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    # stages whose wall time grew past tolerance x the baseline at the same size
+    slower = []
+    for size, stages in current["sizes"].items():
+        for stage, cur in stages.items():
+            base = baseline.get("sizes", {}).get(size, {}).get(stage)
+            if not base or "wall_s" not in cur or base["wall_s"] <= 0: continue
+            ratio = cur["wall_s"] / base["wall_s"]
+            if ratio > tolerance: slower.append(f"{stage} @ {size}: {base['wall_s']}s -> {cur['wall_s']}s ({ratio:.2f}x)")
+    return slower
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="offline decode benchmark against recorded feeds and articles")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    ap.add_argument("--workers", type=int, default=FETCH_WORKERS)
+    ap.add_argument("--skip-nlp", action="store_true", help="skip the spaCy stages (no model needed)")
+    ap.add_argument("--procs", type=int, default=2,
+                    help="decode processes for a pooled end-to-end run checked against the single-process output (1 skips it)")
+    ap.add_argument("--out", type=str, default=str(HERE / "results"))
+    ap.add_argument("--save-baseline", action="store_true", help=f"also write the results to {BASELINE}")
+    ap.add_argument("--tolerance", type=float, default=1.25, help="flag stages slower than this multiple of the baseline")
+    ap.add_argument("--check", action="store_true", help="exit non-zero when a stage regressed")
+    args = ap.parse_args(argv)
+
+    with_nlp = not args.skip_nlp
+    if with_nlp: nlp()  # load the model up front so it isn't billed to the first stage
+    current = {"meta": {"when": datetime.utcnow().isoformat(timespec="seconds") + "Z", "python": platform.python_version(),
+                        "machine": platform.machine(), "workers": args.workers, "nlp": with_nlp},
+               "sizes": {}}
+    for n in args.sizes:
+        current["sizes"][str(n)] = bench_size(n, args.workers, with_nlp, args.procs)
+        print(f"[{n}]", json.dumps({k: v.get("wall_s") for k, v in current["sizes"][str(n)].items() if "wall_s" in v}))
+    mismatched = [n for n, t in current["sizes"].items() if not t.get("pool_output", {}).get("identical", True)]
+    for n in mismatched: print(f"MISMATCH @ {n}: --procs {args.procs} output differs from the single-process output")
+
+    out = Path(args.out); out.mkdir(parents=True, exist_ok=True)
+    path = out / f"bench-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    path.write_text(json.dumps(current, indent=2)); print("Wrote:", path)
+    if args.save_baseline:
+        BASELINE.write_text(json.dumps(current, indent=2)); print("Baseline:", BASELINE)
+    elif BASELINE.exists():
+        slower = compare(current, json.loads(BASELINE.read_text()), args.tolerance)
+        for s in slower: print("SLOWER", s)
+        if slower and args.check: return 1
+    return 1 if mismatched and args.check else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
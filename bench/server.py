@@ -0,0 +1,76 @@
+import random, re, threading, time
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from typing import List
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+FIXTURES = Path(__file__).parent / "fixtures"
+_P = re.compile(r"<p>(.*?)</p>", re.S)
+
+def _load_items() -> List[dict]:
+    items = []
+    for f in sorted((FIXTURES / "rss").glob("*.xml")):
+        root = ElementTree.parse(f).getroot()
+        for it in root.iter("item"):
+            items.append({"title": it.findtext("title"), "description": it.findtext("description") or ""})
+    return items
+
+def _load_pages() -> List[str]:
+    return [f.read_text(encoding="utf-8") for f in sorted((FIXTURES / "articles").glob("*.html"))]
+
+class FixtureServer:
+    # local stand-in for the news sites: n articles spread over n_feeds RSS feeds, built from the recorded fixtures.
+    # article i reuses fixture page i % len(pages) with its paragraphs reshuffled from the whole fixture pool,
+    # so pages look like the recordings without being copies of each other
+    def __init__(self, n_articles: int, n_feeds: int = 4):
+        self.n, self.n_feeds = n_articles, n_feeds
+        self.items, self.pages = _load_items(), _load_pages()
+        self.pool = [p for page in self.pages for p in _P.findall(page)]
+        self.now = time.time()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self._httpd.server_port}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def feed_urls(self) -> List[str]:
+        return [f"{self.base}/feed/{k}.xml" for k in range(self.n_feeds)]
+
+    def feed_xml(self, k: int) -> bytes:
+        parts = [f"<?xml version='1.0' encoding='UTF-8'?><rss version='2.0'><channel><title>Fixture feed {k}</title>"]
+        for i in range(k, self.n, self.n_feeds):
+            it = self.items[i % len(self.items)]
+            parts.append(f"<item><title>{escape(it['title'])} ({i})</title><link>{self.base}/article/{i}?utm_source=bench</link>"
+                         f"<description>{escape(it['description'])}</description><pubDate>{formatdate(self.now - 60 * i, usegmt=True)}</pubDate></item>")
+        parts.append("</channel></rss>")
+        return "".join(parts).encode("utf-8")
+
+    def article_html(self, i: int) -> bytes:
+        page = self.pages[i % len(self.pages)]
+        rnd = random.Random(i)
+        return _P.sub(lambda m: f"<p>{rnd.choice(self.pool)}</p>", page).encode("utf-8")
+
+    def _handler(self):
+        srv = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                m = re.fullmatch(r"/feed/(\d+)\.xml", path) or re.fullmatch(r"/article/(\d+)", path)
+                if not m:
+                    self.send_response(404); self.end_headers(); return
+                feed = path.startswith("/feed/")
+                body = srv.feed_xml(int(m.group(1))) if feed else srv.article_html(int(m.group(1)))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml" if feed else "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers(); self.wfile.write(body)
+            def log_message(self, *args): pass
+        return Handler
+
+    def __enter__(self):
+        self._thread.start(); return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown(); self._httpd.server_close()
@@ -0,0 +1,176 @@
+import argparse, json, time
+from array import array
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import numpy as np
+from .archive import Archive, _iso
+from .config import ARCHIVE_PATH
+
+def feature_label(f: Tuple[str, str, Any]) -> str:
+    kind, calc, v = f
+    return f"{calc}={v}" if kind == "value" else (f"#{v}" if kind == "headline" else f"~{v}")
+
+class _Codes:
+    # value -> dense int code, in first-seen order
+    def __init__(self):
+        self.keys: List[Any] = []; self._ids: Dict[Any, int] = {}
+    def __call__(self, key) -> int:
+        i = self._ids.get(key)
+        if i is None:
+            i = self._ids[key] = len(self.keys); self.keys.append(key)
+        return i
+    def __len__(self) -> int: return len(self.keys)
+
+class Corpus:
+    # a run's (or the archive's) articles as flat columns: one row per distinct (article, feature), where a
+    # feature is a gematria value under a calculator, a symbolic headline number or an archetype. Every
+    # count below is a bincount over those columns, so it scales with rows, not with Python loops
+    def __init__(self):
+        self.features, self.days, self.sources = _Codes(), _Codes(), _Codes()
+        self._art_day, self._art_src = array('i'), array('i')
+        self._rows, self._cols = array('i'), array('i')
+        self._np: Optional[Tuple[np.ndarray, ...]] = None
+
+    def __len__(self) -> int: return len(self._art_day)
+
+    def add(self, item: Dict[str, Any], now: Optional[float] = None) -> None:
+        pat = item.get('patterns') or {}
+        fs = {("value", m['calculator'], m['value']) for m in item.get('matches') or []}
+        fs.update(("headline", "", n) for n in pat.get('headline_symbolic_numbers') or [])
+        fs.update(("archetype", "", a) for a in pat.get('archetype_hits') or [])
+        i = len(self._art_day)
+        self._art_day.append(self.days(_iso(item.get('published'), now or time.time())[:10]))
+        self._art_src.append(self.sources(item.get('source') or ''))
+        for f in fs:
+            self._rows.append(i); self._cols.append(self.features(f))
+        self._np = None
+
+    @classmethod
+    def from_items(cls, items: Iterable[Dict[str, Any]]) -> "Corpus":
+        c, now = cls(), time.time()
+        for it in items: c.add(it, now)
+        return c
+
+    @classmethod
+    def from_archive(cls, archive: Archive, since: Optional[str] = None, until: Optional[str] = None) -> "Corpus":
+        cols = archive.features(since, until)
+        c = cls()
+        ids = np.array([a[0] for a in cols["articles"]], dtype=np.int64)
+        c._art_day = array('i', [c.days(a[1]) for a in cols["articles"]])
+        c._art_src = array('i', [c.sources(a[2]) for a in cols["articles"]])
+        rows, fcols = [], []
+        for kind, recs in (("value", cols["matches"]), ("headline", cols["numbers"]), ("archetype", cols["archetypes"])):
+            if not recs: continue
+            aid = np.fromiter((r[0] for r in recs), dtype=np.int64, count=len(recs))
+            rows.append(np.searchsorted(ids, aid).astype(np.int32))
+            code = c.features
+            fcols.append(np.fromiter((code((kind, r[1], r[2]) if kind == "value" else (kind, "", r[1])) for r in recs),
+                                     dtype=np.int32, count=len(recs)))
+        if rows:
+            c._rows, c._cols = array('i', np.concatenate(rows).tobytes()), array('i', np.concatenate(fcols).tobytes())
+        return c
+
+    def _arrays(self) -> Tuple[np.ndarray, ...]:
+        if self._np is None:
+            self._np = tuple(np.frombuffer(a, dtype=np.int32) if len(a) else np.empty(0, np.int32)
+                             for a in (self._art_day, self._art_src, self._rows, self._cols))
+        return self._np
+
+    def _feature_mask(self, kind: Optional[str], calculator: Optional[str]) -> np.ndarray:
+        return np.array([(kind is None or k == kind) and (calculator is None or c == calculator)
+                         for k, c, _ in self.features.keys], dtype=bool)
+
+    def _select(self, kind=None, calculator=None, day=None, source=None) -> Tuple[np.ndarray, np.ndarray]:
+        # (rows, cols) of the occurrences passing the filters
+        art_day, art_src, rows, cols = self._arrays()
+        keep = self._feature_mask(kind, calculator)[cols] if len(cols) else np.zeros(0, bool)
+        if day is not None: keep &= art_day[rows] == self.days._ids.get(day, -1)
+        if source is not None: keep &= art_src[rows] == self.sources._ids.get(source, -1)
+        return rows[keep], cols[keep]
+
+    def histogram(self, kind=None, calculator=None, day=None, source=None, top: int = 20) -> List[Tuple[str, int]]:
+        # articles per feature, most frequent first
+        _, cols = self._select(kind, calculator, day, source)
+        counts = np.bincount(cols, minlength=len(self.features))
+        order = np.argsort(-counts, kind="stable")[:top]
+        return [(feature_label(self.features.keys[i]), int(counts[i])) for i in order if counts[i]]
+
+    def table(self, by: str = "day", kind=None, calculator=None, top: int = 10) -> Tuple[List[str], List[str], np.ndarray]:
+        # (row labels, feature labels, counts) for the top features, one row per day or per source
+        art_day, art_src, _, _ = self._arrays()
+        rows, cols = self._select(kind, calculator)
+        groups, keys = (art_day, self.days) if by == "day" else (art_src, self.sources)
+        order = np.argsort(keys.keys) if by == "day" else np.arange(len(keys))
+        # only the top features get a column, so the counts are groups x top, never groups x every feature
+        totals = np.bincount(cols, minlength=len(self.features))
+        best = np.argsort(-totals, kind="stable")[:top]
+        best = best[totals[best] > 0]
+        slot = np.full(len(self.features), -1, dtype=np.int64); slot[best] = np.arange(len(best))
+        keep = slot[cols] >= 0
+        B = len(best)
+        m = np.bincount(groups[rows[keep]].astype(np.int64) * B + slot[cols[keep]], minlength=len(keys) * B).reshape(len(keys), B)
+        return [keys.keys[i] for i in order], [feature_label(self.features.keys[i]) for i in best], m[order]
+
+    def spikes(self, day: Optional[str] = None, kind=None, calculator=None, top: int = 10, min_count: int = 2) -> List[Dict[str, Any]]:
+        # features unusually frequent on `day` (default: the latest) against their mean over the other days;
+        # needs at least two days to compare
+        art_day, _, _, _ = self._arrays()
+        if len(self.days) < 2: return []
+        day = day or max(self.days.keys)
+        d = self.days._ids.get(day)
+        if d is None: return []
+        rows, cols = self._select(kind, calculator)
+        F, D = len(self.features), len(self.days)
+        today = np.bincount(cols[art_day[rows] == d], minlength=F)
+        base = (np.bincount(cols, minlength=F) - today) / (D - 1)
+        score = (today - base) / np.sqrt(base + 1)
+        order = [i for i in np.argsort(-score, kind="stable") if today[i] >= min_count][:top]
+        return [{"feature": feature_label(self.features.keys[i]), "day": day, "count": int(today[i]),
+                 "baseline": round(float(base[i]), 2), "score": round(float(score[i]), 2)} for i in order]
+
+    def cooccurrence(self, kind=None, calculator=None, day=None, source=None, top: int = 20) -> Tuple[List[str], np.ndarray]:
+        # articles sharing each pair of the top features: X^T X over an articles x features 0/1 matrix
+        rows, cols = self._select(kind, calculator, day, source)
+        counts = np.bincount(cols, minlength=len(self.features))
+        best = np.argsort(-counts, kind="stable")[:top]
+        best = best[counts[best] > 0]
+        slot = np.full(len(self.features), -1, dtype=np.int64); slot[best] = np.arange(len(best))
+        keep = slot[cols] >= 0
+        arts, r = np.unique(rows[keep], return_inverse=True)
+        x = np.zeros((len(arts), len(best)), dtype=np.float32)
+        x[r, slot[cols[keep]]] = 1.0
+        return [feature_label(self.features.keys[i]) for i in best], (x.T @ x).round().astype(np.int64)
+
+    def pairs(self, top: int = 10, **kw) -> List[Tuple[str, str, int]]:
+        labels, m = self.cooccurrence(**kw)
+        if not labels: return []
+        iu = np.triu_indices(len(labels), k=1)
+        vals = m[iu]
+        order = np.argsort(-vals, kind="stable")[:top]
+        return [(labels[iu[0][k]], labels[iu[1][k]], int(vals[k])) for k in order if vals[k]]
+
+def summarize(corpus: Corpus, top: int = 10) -> Dict[str, Any]:
+    # the JSON-able digest the Markdown report and the dashboard show
+    calcs = sorted({c for k, c, _ in corpus.features.keys if k == "value"})
+    return {
+        "articles": len(corpus), "days": sorted(corpus.days.keys), "sources": len(corpus.sources),
+        "values": {c: corpus.histogram("value", c, top=top) for c in calcs},
+        "headline_numbers": corpus.histogram("headline", top=top),
+        "archetypes": corpus.histogram("archetype", top=top),
+        "spikes": corpus.spikes(top=top),
+        "pairs": corpus.pairs(top=top),
+    }
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="number / archetype frequency and co-occurrence over the archive")
+    ap.add_argument("--archive", type=str, default=ARCHIVE_PATH)
+    ap.add_argument("--since", type=str); ap.add_argument("--until", type=str)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+    from .report import markdown_analytics
+    t0 = time.perf_counter()
+    arc = Archive(args.archive)
+    summary = summarize(Corpus.from_archive(arc, args.since, args.until), top=args.top)
+    arc.close()
+    print(json.dumps(summary, ensure_ascii=False, indent=2) if args.json else "\n".join(markdown_analytics(summary)))
+    print(f"({summary['articles']} articles in {time.perf_counter() - t0:.2f}s)")
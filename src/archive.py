@@ -0,0 +1,175 @@
+import argparse, glob, json, sqlite3, sys, time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+from .config import ARCHIVE_PATH
+from .dates import parse_published
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY, link TEXT UNIQUE NOT NULL, title TEXT, source TEXT COLLATE NOCASE,
+    published TEXT NOT NULL, score INTEGER, archived_at REAL NOT NULL, result TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS matches (
+    article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+    phrase TEXT, db_phrase TEXT COLLATE NOCASE, calculator TEXT, value INTEGER);
+CREATE TABLE IF NOT EXISTS archetypes (
+    article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+    archetype TEXT COLLATE NOCASE, hits INTEGER);
+CREATE TABLE IF NOT EXISTS numbers (
+    article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE, number INTEGER);
+CREATE INDEX IF NOT EXISTS articles_published ON articles(published);
+CREATE INDEX IF NOT EXISTS articles_source ON articles(source, published);
+CREATE INDEX IF NOT EXISTS matches_value ON matches(value, calculator);
+CREATE INDEX IF NOT EXISTS matches_calc ON matches(calculator, value);
+CREATE INDEX IF NOT EXISTS matches_db_phrase ON matches(db_phrase);
+CREATE INDEX IF NOT EXISTS matches_article ON matches(article_id);
+CREATE INDEX IF NOT EXISTS archetypes_name ON archetypes(archetype, article_id);
+CREATE INDEX IF NOT EXISTS archetypes_article ON archetypes(article_id);
+CREATE INDEX IF NOT EXISTS numbers_article ON numbers(article_id);
+"""
+
+def _iso(published: Optional[str], fallback: Optional[float] = None) -> str:
+    # sortable UTC timestamp; articles without a (parseable) date are filed under the time they were archived
+    dt = parse_published(published) if published else None
+    if dt is None:
+        if fallback is None: raise ValueError(f"not a date: {published!r}")
+        dt = datetime.fromtimestamp(fallback, timezone.utc)
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+class Archive:
+    # every decoded article across runs, one row per link (a later decode replaces the earlier one),
+    # with its matches, archetype hits and headline numbers broken out so they can be searched through indexes
+    def __init__(self, path: str = ARCHIVE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def add(self, item: Dict[str, Any]) -> None:
+        # not committed until commit(); a run archives all of its articles in one transaction
+        now = time.time()
+        pat = item.get('patterns') or {}
+        self._db.execute("DELETE FROM articles WHERE link=?", (item['link'],))
+        cur = self._db.execute("INSERT INTO articles (link, title, source, published, score, archived_at, result) VALUES (?,?,?,?,?,?,?)",
+                               (item['link'], item.get('title'), item.get('source'), _iso(item.get('published'), now),
+                                pat.get('score'), now, json.dumps(item, ensure_ascii=False)))
+        aid = cur.lastrowid
+        self._db.executemany("INSERT INTO matches VALUES (?,?,?,?,?)",
+                             [(aid, m['phrase'], m['db_phrase'], m['calculator'], m['value']) for m in item.get('matches') or []])
+        counts = pat.get('archetype_counts') or {}
+        self._db.executemany("INSERT INTO archetypes VALUES (?,?,?)",
+                             [(aid, a, counts.get(a)) for a in pat.get('archetype_hits') or []])
+        self._db.executemany("INSERT INTO numbers VALUES (?,?)", [(aid, n) for n in pat.get('headline_symbolic_numbers') or []])
+
+    def commit(self) -> None: self._db.commit()
+
+    def ingest(self, items: Iterable[Dict[str, Any]]) -> int:
+        n = 0
+        for it in items:
+            self.add(it); n += 1
+        self.commit()
+        return n
+
+    def ingest_report(self, path: str) -> int:
+        # a report-*.json (list of items) or a streamed report-*.jsonl (one item per line); anything else (a
+        # report-*.timings.json, say) raises ValueError before a row is written
+        text = Path(path).read_text(encoding='utf-8')
+        items = [json.loads(ln) for ln in text.splitlines() if ln.strip()] if path.endswith('.jsonl') else json.loads(text)
+        if not isinstance(items, list) or not all(isinstance(it, dict) and 'link' in it for it in items):
+            raise ValueError("not a report: expected a list of decoded articles")
+        return self.ingest(items)
+
+    def query(self, value: Optional[int] = None, calculator: Optional[str] = None, db_phrase: Optional[str] = None,
+              archetype: Optional[str] = None, source: Optional[str] = None, since: Optional[str] = None,
+              until: Optional[str] = None, limit: int = 100, full: bool = False) -> List[Dict[str, Any]]:
+        # newest first; since/until are ISO dates or timestamps (until is exclusive). With match filters
+        # each article carries only the matches that satisfied them; full=True adds the stored result
+        where, args = [], []
+        if since: where.append("a.published >= ?"); args.append(_iso(since))
+        if until: where.append("a.published < ?"); args.append(_iso(until))
+        if source: where.append("a.source = ?"); args.append(source)
+        if archetype:
+            where.append("EXISTS (SELECT 1 FROM archetypes x WHERE x.article_id = a.id AND x.archetype = ?)"); args.append(archetype)
+        mwhere, margs = [], []
+        if value is not None: mwhere.append("m.value = ?"); margs.append(int(value))
+        if calculator: mwhere.append("m.calculator = ?"); margs.append(calculator)
+        if db_phrase: mwhere.append("m.db_phrase = ?"); margs.append(db_phrase)
+        if mwhere:
+            # a value or db_phrase picks out few rows, so start from the matches index; a calculator
+            # alone doesn't, so check it per article found through the date/source indexes instead
+            if value is not None or db_phrase:
+                where.append("a.id IN (SELECT article_id FROM matches m WHERE " + " AND ".join(mwhere) + ")")
+            else:
+                where.append("EXISTS (SELECT 1 FROM matches m WHERE m.article_id = a.id AND " + " AND ".join(mwhere) + ")")
+            args += margs
+        sql = ("SELECT a.id, a.link, a.title, a.source, a.published, a.score" + (", a.result" if full else "") + " FROM articles a"
+               + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY a.published DESC LIMIT ?")
+        out = []
+        for row in self._db.execute(sql, args + [limit]).fetchall():
+            rec = {"link": row[1], "title": row[2], "source": row[3], "published": row[4], "score": row[5]}
+            msql = "SELECT phrase, db_phrase, calculator, value FROM matches m WHERE m.article_id = ?" + "".join(" AND " + w for w in mwhere)
+            rec["matches"] = [{"phrase": p, "db_phrase": d, "calculator": c, "value": v}
+                              for p, d, c, v in self._db.execute(msql, [row[0]] + margs)]
+            rec["archetypes"] = [a for (a,) in self._db.execute("SELECT archetype FROM archetypes WHERE article_id = ?", (row[0],))]
+            if full: rec["result"] = json.loads(row[6])
+            out.append(rec)
+        return out
+
+    def features(self, since: Optional[str] = None, until: Optional[str] = None) -> Dict[str, List[tuple]]:
+        # raw columns for analytics.Corpus: articles (id, day, source) and, per article id, its distinct
+        # (calculator, value) matches, archetypes and headline numbers
+        where, args = [], []
+        if since: where.append("published >= ?"); args.append(_iso(since))
+        if until: where.append("published < ?"); args.append(_iso(until))
+        cond = " WHERE " + " AND ".join(where) if where else ""
+        sel = f"SELECT id FROM articles{cond}"
+        q = lambda sql: self._db.execute(sql, args).fetchall()
+        return {
+            "articles": q(f"SELECT id, substr(published, 1, 10), coalesce(source, '') FROM articles{cond} ORDER BY id"),
+            "matches": q(f"SELECT DISTINCT article_id, calculator, value FROM matches WHERE article_id IN ({sel})"),
+            "archetypes": q(f"SELECT DISTINCT article_id, archetype FROM archetypes WHERE article_id IN ({sel})"),
+            "numbers": q(f"SELECT DISTINCT article_id, number FROM numbers WHERE article_id IN ({sel})"),
+        }
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self) -> None: self._db.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="archive of decoded articles across runs")
+    ap.add_argument("--archive", type=str, default=ARCHIVE_PATH)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ing = sub.add_parser("ingest", help="load report-*.json / report-*.jsonl files into the archive")
+    ing.add_argument("reports", nargs="+", help="report files or glob patterns")
+    q = sub.add_parser("query", help="search the archive")
+    q.add_argument("--value", type=int); q.add_argument("--calculator", type=str); q.add_argument("--db-phrase", type=str)
+    q.add_argument("--archetype", type=str); q.add_argument("--source", type=str)
+    q.add_argument("--since", type=str); q.add_argument("--until", type=str)
+    q.add_argument("--limit", type=int, default=100)
+    q.add_argument("--json", action="store_true", help="print the matching articles as JSON")
+    args = ap.parse_args()
+    arc = Archive(args.archive)
+    if args.cmd == "ingest":
+        bad = 0
+        for pattern in args.reports:
+            # report-*.json also matches the report-*.timings.json written next to each report
+            for path in [p for p in sorted(glob.glob(pattern)) if not p.endswith('.timings.json')] or [pattern]:
+                try: print(f"{path}: {arc.ingest_report(path)} articles")
+                except (OSError, ValueError) as exc:
+                    print(f"{path}: skipped ({exc})", file=sys.stderr); bad += 1
+        print("Archive:", args.archive, f"({len(arc)} articles)" + (f", {bad} file(s) skipped" if bad else ""))
+    else:
+        t0 = time.perf_counter()
+        rows = arc.query(value=args.value, calculator=args.calculator, db_phrase=args.db_phrase, archetype=args.archetype,
+                         source=args.source, since=args.since, until=args.until, limit=args.limit)
+        if args.json:
+            print(json.dumps(rows, ensure_ascii=False, indent=2))
+        else:
+            for r in rows:
+                hits = "; ".join(f"{m['calculator']}={m['value']} {m['phrase']} ~ {m['db_phrase']}" for m in r["matches"][:5])
+                print(f"{r['published'][:10]}  {r['source'] or '—'}  {r['title']}\n    {r['link']}" + (f"\n    {hits}" if hits else ""))
+            print(f"{len(rows)} article(s) in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    arc.close()
@@ -0,0 +1,127 @@
+import argparse, bisect, json, mmap, os, struct
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from .config import CALCULATORS
+from .gematria import batch_values
+
+# layout (little endian, sections 8-byte aligned):
+#   header | calculator names (JSON) | string offsets u64[n+1] | UTF-8 string table |
+#   per calculator: values i64[n] sorted ascending, phrase ids u32[n] in the same order
+MAGIC = b"NDPHRDB1"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIIQQI")  # magic, version, n_phrases, n_calcs, source size, source mtime_ns, names len
+_CHUNK = 100_000
+
+def _pad(n: int) -> int: return (n + 7) & ~7
+
+def read_phrases(source: str) -> List[str]:
+    # phrases.json-style dict or list, or a plain wordlist with one phrase per line
+    p = Path(source)
+    if p.suffix == ".json":
+        data = json.loads(p.read_text(encoding="utf-8"))
+        items = list(data.keys()) if isinstance(data, dict) else list(data)
+    else:
+        items = [ln.strip() for ln in p.read_text(encoding="utf-8").splitlines()]
+    return [x for x in dict.fromkeys(items) if x]
+
+def default_output(source: str) -> str:
+    return str(Path(source).with_suffix(".bin"))
+
+def build(source: str, output: Optional[str] = None, calculators: Optional[List[str]] = None) -> str:
+    output = output or default_output(source)
+    calculators = calculators or CALCULATORS
+    phrases = read_phrases(source)
+    st = os.stat(source)
+    blobs = [p.encode("utf-8") for p in phrases]
+    offsets = np.zeros(len(blobs) + 1, dtype="<u8")
+    if blobs: np.cumsum([len(b) for b in blobs], out=offsets[1:])
+    names = json.dumps(calculators).encode("utf-8")
+    tmp = output + ".tmp"
+    with open(tmp, "wb") as f:
+        def write(buf: bytes):
+            f.write(buf); f.write(b"\0" * (_pad(len(buf)) - len(buf)))
+        write(_HEADER.pack(MAGIC, VERSION, len(phrases), len(calculators), st.st_size, st.st_mtime_ns, len(names)))
+        write(names)
+        write(offsets.tobytes())
+        write(b"".join(blobs))
+        table = {c: np.empty(len(phrases), dtype="<i8") for c in calculators}
+        for i in range(0, len(phrases), _CHUNK):
+            for c, col in batch_values(phrases[i:i + _CHUNK], calculators).items():
+                table[c][i:i + _CHUNK] = col
+        for c in calculators:
+            vals = table[c]
+            order = np.argsort(vals, kind="stable")
+            write(vals[order].tobytes())
+            write(order.astype("<u4").tobytes())
+    os.replace(tmp, output)
+    return output
+
+class PhraseDB:
+    # read-only, memory-mapped compiled phrase DB; same ids()/name() interface as match.ValueIndex
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mv = memoryview(self._mm)
+        magic, version, n, k, self.source_size, self.source_mtime_ns, nlen = _HEADER.unpack_from(mv)
+        if magic != MAGIC or version != VERSION: raise ValueError(f"not a phrase DB: {path}")
+        pos = _pad(_HEADER.size)
+        self.calculators = json.loads(bytes(mv[pos:pos + nlen])); pos += _pad(nlen)
+        self._offsets = mv[pos:pos + 8 * (n + 1)].cast("Q"); pos += _pad(8 * (n + 1))
+        self._strings = mv[pos:pos + self._offsets[n]]; pos += _pad(self._offsets[n])
+        self.by_calc = {}
+        for c in self.calculators:
+            vals = mv[pos:pos + 8 * n].cast("q"); pos += _pad(8 * n)
+            ids = mv[pos:pos + 4 * n].cast("I"); pos += _pad(4 * n)
+            self.by_calc[c] = (vals, ids)
+        self._n = n
+        self._names: Optional[List[str]] = None
+
+    def __len__(self) -> int: return self._n
+
+    def ids(self, num: int) -> List[int]:
+        out = set()
+        for vals, ids in self.by_calc.values():
+            lo = bisect.bisect_left(vals, num)
+            if lo < self._n and vals[lo] == num:
+                out.update(ids[lo:bisect.bisect_right(vals, num, lo)])
+        return sorted(out)
+
+    def name(self, i: int) -> str:
+        return bytes(self._strings[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    @property
+    def names(self) -> List[str]:
+        if self._names is None: self._names = [self.name(i) for i in range(self._n)]
+        return self._names
+
+def is_current(source: str, output: str, calculators: Optional[List[str]] = None) -> bool:
+    try:
+        with open(output, "rb") as f:
+            magic, version, _, _, size, mtime_ns, nlen = _HEADER.unpack(f.read(_HEADER.size))
+            f.seek(_pad(_HEADER.size)); names = json.loads(f.read(nlen))
+    except (OSError, struct.error, ValueError):
+        return False
+    st = os.stat(source)
+    return (magic == MAGIC and version == VERSION and size == st.st_size and mtime_ns == st.st_mtime_ns
+            and names == (calculators or CALCULATORS))
+
+def load_phrase_db(source: str, output: Optional[str] = None) -> PhraseDB:
+    # open the compiled DB for source, (re)building it only when the source has changed
+    output = output or default_output(source)
+    if not is_current(source, output): build(source, output)
+    return PhraseDB(output)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="compile a phrase source into a memory-mapped phrase DB")
+    ap.add_argument("source", nargs="?", default="database/phrases.json")
+    ap.add_argument("-o", "--output", type=str, default=None)
+    ap.add_argument("--force", action="store_true", help="rebuild even if the compiled DB is current")
+    args = ap.parse_args()
+    out = args.output or default_output(args.source)
+    if args.force or not is_current(args.source, out):
+        build(args.source, out)
+        print("Built:", out)
+    else:
+        print("Up to date:", out)
@@ -0,0 +1,81 @@
+import json, sqlite3, hashlib, threading, time
+from pathlib import Path
+from typing import Dict, Any, Optional
+from .config import ARTICLE_CACHE_PATH, ARTICLE_CACHE_TTL_SECONDS, ARTICLE_CACHE_MAX_ENTRIES
+from .ingest import _normalize_url
+
+def content_hash(parsed: Dict[str, Any]) -> str:
+    # what a decode depends on from the article: its title, text and publish time
+    body = "\n".join([parsed.get('title') or '', parsed.get('text') or '', parsed.get('published') or ''])
+    return hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+class ArticleCache:
+    # fetch_and_parse results keyed by normalized URL, with a TTL and LRU eviction past max_entries, plus the
+    # decoded NLP/gematria/match output keyed by content hash, so an unchanged article isn't decoded again.
+    # Reads don't write: access times are kept in memory and flushed with the next put, flush() or close()
+    def __init__(self, path: str = ARTICLE_CACHE_PATH, ttl: float = ARTICLE_CACHE_TTL_SECONDS,
+                 max_entries: int = ARTICLE_CACHE_MAX_ENTRIES):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl, self.max_entries = ttl, max_entries
+        self._lock = threading.Lock()
+        self._touched: Dict[str, Dict[str, float]] = {"articles": {}, "decoded": {}}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        if "content_hash" in [r[1] for r in self._db.execute("PRAGMA table_info(articles)")]:
+            self._db.execute("DROP TABLE articles")  # an older layout; it's only a cache, so start it over
+        self._db.execute("""CREATE TABLE IF NOT EXISTS articles (
+            key TEXT PRIMARY KEY, payload TEXT NOT NULL, fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS articles_accessed ON articles(accessed_at)")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS decoded (
+            key TEXT PRIMARY KEY, decoder TEXT NOT NULL, payload TEXT NOT NULL, accessed_at REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS decoded_accessed ON decoded(accessed_at)")
+        self._db.commit()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        key, now = _normalize_url(url), time.time()
+        with self._lock:
+            row = self._db.execute("SELECT payload, fetched_at FROM articles WHERE key=?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl: return None  # an expired row is replaced by the next put
+            self._touched["articles"][key] = now
+        return json.loads(row[0])
+
+    def put(self, url: str, parsed: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO articles VALUES (?,?,?,?)",
+                             (_normalize_url(url), json.dumps(parsed, ensure_ascii=False), now, now))
+            self._commit("articles")
+
+    def decoded(self, key: str, decoder: str) -> Optional[Dict[str, Any]]:
+        # the decode stored for this content hash by the same decoder (phrase DB, calculators, model, options)
+        with self._lock:
+            row = self._db.execute("SELECT payload FROM decoded WHERE key=? AND decoder=?", (key, decoder)).fetchone()
+            if row is None: return None
+            self._touched["decoded"][key] = time.time()
+        return json.loads(row[0])
+
+    def put_decoded(self, key: str, decoder: str, parts: Dict[str, Any]) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO decoded VALUES (?,?,?,?)",
+                             (key, decoder, json.dumps(parts, ensure_ascii=False), time.time()))
+            self._commit("decoded")
+
+    def _commit(self, table: str) -> None:
+        # flush deferred access times, evict past max_entries, commit; the caller holds the lock
+        for name, touched in self._touched.items():
+            if touched: self._db.executemany(f"UPDATE {name} SET accessed_at=? WHERE key=?", [(t, k) for k, t in touched.items()])
+            touched.clear()
+        n = self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if n > self.max_entries:
+            self._db.execute(f"DELETE FROM {table} WHERE key IN (SELECT key FROM {table} ORDER BY accessed_at LIMIT ?)",
+                             (n - self.max_entries,))
+        self._db.commit()
+
+    def flush(self) -> None:
+        with self._lock:
+            if any(self._touched.values()): self._commit("articles")
+
+    def close(self) -> None:
+        with self._lock:
+            if any(self._touched.values()): self._commit("articles")
+            self._db.close()
@@ -0,0 +1,104 @@
+import argparse
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Union
+import numpy as np
+from .astrology import SIGNS, sign_code, basic_astrology
+from .config import CALENDAR_START_YEAR, CALENDAR_END_YEAR
+from .numerology import date_numerology
+
+def _digit_sum(a: np.ndarray) -> np.ndarray:
+    a, s = a.copy(), np.zeros_like(a)
+    while a.any():
+        s += a % 10; a //= 10
+    return s
+
+def _reduce_to_root(a: np.ndarray) -> np.ndarray:
+    a = a.copy()
+    while True:
+        todo = (a > 9) & ~np.isin(a, (11, 22, 33))
+        if not todo.any(): return a
+        a[todo] = _digit_sum(a[todo])
+
+def _reversed_digits(a: np.ndarray) -> np.ndarray:
+    a, r = a.copy(), np.zeros_like(a)
+    while a.any():
+        r = r * 10 + a % 10; a //= 10
+    return r
+
+class CalendarTable:
+    # date_numerology and the sun sign for every day in [start, end] as numpy columns: article lookups are
+    # an index into them and reverse queries ("dates with life_path 11") are one boolean mask
+    def __init__(self, start: date, end: date):
+        self.start, self.end = start, end
+        days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+        months = days.astype('datetime64[M]')
+        self.year = days.astype('datetime64[Y]').astype(np.int64) + 1970
+        self.month = months.astype(np.int64) % 12 + 1
+        self.day = (days - months).astype(np.int64) + 1
+        full = self.year * 10000 + self.month * 100 + self.day
+        self.year_sum, self.month_sum, self.day_sum = _digit_sum(self.year), _digit_sum(self.month), _digit_sum(self.day)
+        self.ymd_sum = _digit_sum(full)
+        self.life_path = _reduce_to_root(self.year_sum + self.month_sum + self.day_sum)
+        self.master_day = np.isin(self.day, (11, 22))
+        self.palindrome = _reversed_digits(full) == full
+        self.sign = sign_code(self.month, self.day)
+        self._days = days
+        self._rows: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self) -> int: return len(self._days)
+
+    def _index(self, dt: Union[date, datetime]) -> Optional[int]:
+        i = (date(dt.year, dt.month, dt.day) - self.start).days
+        return i if 0 <= i < len(self._days) else None
+
+    def numerology(self, dt: Union[date, datetime]) -> Dict[str, Any]:
+        # same dict as numerology.date_numerology; dates outside the table fall back to it
+        i = self._index(dt)
+        if i is None: return date_numerology(dt)
+        row = self._rows.get(i)
+        if row is None:
+            row = self._rows[i] = {
+                'year_sum': int(self.year_sum[i]), 'month_sum': int(self.month_sum[i]), 'day_sum': int(self.day_sum[i]),
+                'ymd_sum': int(self.ymd_sum[i]), 'life_path': int(self.life_path[i]),
+                'master_day': bool(self.master_day[i]), 'is_palindrome_date': bool(self.palindrome[i]),
+            }
+        return dict(row)
+
+    def astrology(self, dt: Union[date, datetime]) -> Dict[str, Any]:
+        i = self._index(dt)
+        return {'sun_sign': SIGNS[self.sign[i]]} if i is not None else basic_astrology(dt)
+
+    def find(self, life_path: Optional[int] = None, ymd_sum: Optional[int] = None, master_day: Optional[bool] = None,
+             palindrome: Optional[bool] = None, sun_sign: Optional[str] = None, since: Optional[date] = None,
+             until: Optional[date] = None, limit: Optional[int] = None) -> List[date]:
+        # dates in [since, until] (default: the whole table) meeting every given condition, in order
+        mask = np.ones(len(self._days), dtype=bool)
+        if since: mask[:max(0, (since - self.start).days)] = False
+        if until: mask[max(0, (until - self.start).days + 1):] = False
+        if life_path is not None: mask &= self.life_path == life_path
+        if ymd_sum is not None: mask &= self.ymd_sum == ymd_sum
+        if master_day is not None: mask &= self.master_day == master_day
+        if palindrome is not None: mask &= self.palindrome == palindrome
+        if sun_sign is not None: mask &= self.sign == SIGNS.index(sun_sign)
+        idx = np.flatnonzero(mask)[:limit]
+        return [d.item() for d in self._days[idx]]
+
+@lru_cache(maxsize=1)
+def calendar() -> CalendarTable:
+    return CalendarTable(date(CALENDAR_START_YEAR, 1, 1), date(CALENDAR_END_YEAR, 12, 31))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="find dates by numerology / sun sign")
+    ap.add_argument("--life-path", type=int); ap.add_argument("--ymd-sum", type=int)
+    ap.add_argument("--master-day", action="store_true", default=None); ap.add_argument("--palindrome", action="store_true", default=None)
+    ap.add_argument("--sun-sign", type=str, choices=SIGNS)
+    ap.add_argument("--since", type=date.fromisoformat, default=date.today(), help="YYYY-MM-DD (default: today)")
+    ap.add_argument("--until", type=date.fromisoformat)
+    ap.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args()
+    cal = calendar()
+    for d in cal.find(life_path=args.life_path, ymd_sum=args.ymd_sum, master_day=args.master_day, palindrome=args.palindrome,
+                      sun_sign=args.sun_sign, since=args.since, until=args.until, limit=args.limit):
+        n = cal.numerology(d)
+        print(d.isoformat(), f"life_path={n['life_path']} ymd_sum={n['ymd_sum']}", cal.astrology(d)['sun_sign'])
@@ -16,3 +16,50 @@ MIN_TITLE_LEN = 6
 CALCULATORS = ["english_ordinal","full_reduction","reverse_ordinal","reverse_reduction","sumerian"]
 SYMBOLIC_NUMBERS = [11,13,22,23,33,36,42,44,47,54,66,77,88,93,99]
 WHY_MARKERS = ["because","due to","amid","after","as","to","so that","over","for","in order to"]
+FETCH_WORKERS = 8
+FETCH_PER_HOST = 2
+FETCH_DEADLINE_SECONDS = 180
+FETCH_TIMEOUT_SECONDS = 15
+FETCH_MAX_BYTES = 5 * 1024 * 1024  # article pages are read up to this size
+FEED_WORKERS = 16
+FEED_STATE_PATH = ".cache/feeds.json"
+ARTICLE_CACHE_PATH = ".cache/articles.sqlite"
+ARTICLE_CACHE_TTL_SECONDS = 60*60*24
+ARTICLE_CACHE_MAX_ENTRIES = 5000
+NLP_MAX_CHARS = 200000
+GEMATRIA_MAX_CHARS = 4000
+NLP_PROCESSES = 1
+NLP_MODEL = "en_core_web_sm"
+NLP_MODE = "fast"  # 'fast' excludes the lemmatizer and parser (senter gives sentences); 'full' loads everything
+WHEN_CACHE_SIZE = 4096  # memoized (fragment, reference day) -> parsed 5W "when" dates
+LEDGER_PATH = ".cache/ledger.sqlite"
+ARCHIVE_PATH = "docs/archive.sqlite"
+DECODE_PROCESSES = 1  # >1 runs NLP + matching in a process pool alongside fetching; 0 = one per core
+DECODE_QUEUE_SIZE = 32
+DECODE_CHUNK = 64  # articles the single-process pipeline fetches and decodes at a time, so a run holds one chunk in memory
+NEAR_DUPLICATES = True  # decode a story carried by several feeds once and reuse it for the other copies
+NEAR_DUP_THRESHOLD = 0.7  # estimated Jaccard overlap of word shingles for two articles to count as the same story
+NEAR_DUP_MIN_WORDS = 50  # shorter extracts (paywall stubs, teasers) are never treated as duplicates
+NEAR_DUP_SHINGLE = 3  # words per shingle
+NEAR_DUP_PERMUTATIONS = 128  # MinHash signature length
+NEAR_DUP_BAND_ROWS = 4  # signature values per LSH band
+NEAR_DUP_WINDOW = 5000  # canonical articles kept to compare against (and reuse); older ones are forgotten
+FUZZY_MATCHING = False  # also match phrases to DB phrases by text (rapidfuzz), e.g. "Phoenix Suns" ~ "Phoenix"
+FUZZY_SCORER = "WRatio"
+FUZZY_SCORE_CUTOFF = 90
+FUZZY_LIMIT = 5  # per phrase
+FUZZY_WORKERS = -1  # -1 = all cores
+FUZZY_CHUNK = 100_000  # DB phrases per cdist call
+CALENDAR_START_YEAR = 1900  # numerology / sun-sign tables cover these years; other dates are computed directly
+CALENDAR_END_YEAR = 2100
+RESULT_STRINGS_MAX = 200_000  # compact results intern strings into a table; past this many a new table starts
+RESULT_LAYOUTS_MAX = 1024  # distinct dict key layouts shared between compact results
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8502
+SERVE_URL = ""  # e.g. "http://127.0.0.1:8502": the dashboard then shows a running `python -m src.serve` instead of decoding
+SERVE_MAX_RESULTS = 5000
+FEED_POLL_MIN_SECONDS = 120
+FEED_POLL_MAX_SECONDS = 3600
+FEED_POLL_BACKOFF = 1.5  # interval factor after a quiet poll (squared after a failed one, divided after new entries)
+ARTICLE_RETRY_SECONDS = 300  # serve retries an article that failed to fetch or decode after this, doubling per failure
+ARTICLE_RETRY_MAX_SECONDS = 6*3600
@@ -0,0 +1,86 @@
+import re
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple, Union
+from dateutil import parser as dateutil_parser
+from .config import WHEN_CACHE_SIZE
+
+# English month names and the abbreviations news copy uses ("Sept", "Oct.")
+_MONTHS = {m: i for i, names in enumerate([
+    ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"), ("may",), ("june", "jun"),
+    ("july", "jul"), ("august", "aug"), ("september", "sep", "sept"), ("october", "oct"), ("november", "nov"),
+    ("december", "dec")], 1) for m in names}
+_MON = r"(?P<mon>" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\.?"
+_DAY = r"(?P<day>\d{1,2})(?:st|nd|rd|th)?"
+_FAST = [re.compile(p, re.I) for p in (
+    r"(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})",           # 2024-10-15
+    _MON + r"\s+" + _DAY + r",?\s+(?P<year>\d{4})",              # October 15, 2024 / Sept 3 2024
+    _DAY + r"\s+" + _MON + r",?\s+(?P<year>\d{4})",              # 15 October 2024 / 3rd March 2024
+)]
+
+@lru_cache(maxsize=65536)
+def parse_published(published: str) -> Optional[datetime]:
+    # a feed/article timestamp as an aware UTC datetime: ISO and RFC 2822 first, dateutil's guessing last
+    try:
+        dt = datetime.fromisoformat(published.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            dt = parsedate_to_datetime(published)
+        except (TypeError, ValueError, IndexError):
+            try:
+                dt = dateutil_parser.parse(published)
+            except (ValueError, OverflowError):
+                return None
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+def reference_time(ref_date_iso: Optional[Union[str, datetime]] = None) -> datetime:
+    # relative fragments ("yesterday", "last week") resolve against the article's date (naive UTC), or now
+    # when it has no usable date
+    dt = ref_date_iso if isinstance(ref_date_iso, datetime) else (parse_published(ref_date_iso) if ref_date_iso else None)
+    dt = dt.astimezone(timezone.utc) if dt is not None and dt.tzinfo else (dt or datetime.now(timezone.utc))
+    return dt.replace(tzinfo=None)
+
+def _fast(fragment: str) -> Optional[datetime]:
+    for rx in _FAST:
+        m = rx.fullmatch(fragment)
+        if m:
+            g = m.groupdict()
+            month = int(g["month"]) if g.get("month") else _MONTHS[g["mon"].lower()]
+            try:
+                return datetime(int(g["year"]), month, int(g["day"]))
+            except ValueError:
+                return None
+    return None
+
+@lru_cache(maxsize=64)
+def _parser(base: datetime):
+    # one English-only dateparser per reference day, so languages and settings are resolved once
+    from dateparser.date import DateDataParser
+    return DateDataParser(languages=['en'], settings={'RELATIVE_BASE': base})
+
+@lru_cache(maxsize=WHEN_CACHE_SIZE)
+def _parse_when(fragment: str, day: datetime) -> Optional[Tuple[datetime, bool]]:
+    # (date, relative), parsed against the start of the reference day so it can be memoized per day. A
+    # relative date ("two hours ago", "yesterday") moves with its base, so it is told apart by parsing it
+    # again an hour later; the caller shifts it by the reference time's offset into the day
+    dt = _fast(fragment)
+    if dt is not None: return dt, False
+    dt = _parser(day).get_date_data(fragment).date_obj
+    if dt is None: return None
+    return dt, _parser(day + timedelta(hours=1)).get_date_data(fragment).date_obj != dt
+
+def _when(fragment: str, ref: datetime) -> Optional[str]:
+    day = datetime(ref.year, ref.month, ref.day)
+    r = _parse_when(fragment.strip(), day)
+    if r is None: return None
+    return (r[0] + (ref - day) if r[1] else r[0]).isoformat()
+
+def parse_when(fragment: str, ref_date_iso: Optional[Union[str, datetime]] = None) -> Optional[str]:
+    # a 5W "when" mention as an ISO string (None if it isn't a date); memoized on (fragment, reference day)
+    return _when(fragment, reference_time(ref_date_iso))
+
+def parse_when_many(fragments: Iterable[str], ref_date_iso: Optional[Union[str, datetime]] = None) -> List[str]:
+    # the parsed ISO strings, in order, skipping fragments that aren't dates
+    ref = reference_time(ref_date_iso)
+    return [iso for iso in (_when(f, ref) for f in fragments) if iso]
@@ -1,33 +1,45 @@
+from typing import Dict, List, Optional
+import numpy as np
+from .config import CALCULATORS
 
-import re
-A2Z = {chr(i+65): i+1 for i in range(26)}
-Z2A = {chr(i+65): 26-i for i in range(26)}
+# byte tables: strip everything but ASCII letters, fold to upper case, then weigh each letter
+_KEEP = bytes(range(65, 91)) + bytes(range(97, 123))
+_DROP = bytes(b for b in range(256) if b not in _KEEP)
+_UPPER = bytes.maketrans(bytes(range(97, 123)), bytes(range(65, 91)))
 
-def _letters(s: str) -> str:
-    return re.sub(r"[^A-Za-z]", "", s).upper()
+def _weights(f) -> bytes:
+    return bytes(f(b - 64) if 65 <= b <= 90 else 0 for b in range(256))
 
-def english_ordinal(s: str) -> int:
-    t = _letters(s); return sum(A2Z.get(ch, 0) for ch in t)
+_ORD = _weights(lambda n: n)
+_RED = _weights(lambda n: ((n - 1) % 9) + 1)
+_REV = _weights(lambda n: 27 - n)
+_REVRED = _weights(lambda n: ((26 - n) % 9) + 1)
+# calculator -> (byte weights, multiplier)
+CALC_TABLES = {
+    'english_ordinal': (_ORD, 1),
+    'full_reduction': (_RED, 1),
+    'reverse_ordinal': (_REV, 1),
+    'reverse_reduction': (_REVRED, 1),
+    'sumerian': (_ORD, 6),
+}
+_NP_TABLES = {k: np.frombuffer(w, dtype=np.uint8).astype(np.int64) * mult for k, (w, mult) in CALC_TABLES.items()}
+
+def _letter_bytes(s: str) -> bytes:
+    return s.encode('ascii', 'ignore').translate(_UPPER, _DROP)
+
+def _calc(s: str, name: str) -> int:
+    w, mult = CALC_TABLES[name]
+    return sum(_letter_bytes(s).translate(w)) * mult
 
-def full_reduction(s: str) -> int:
-    t = _letters(s); total = 0
-    for ch in t:
-        n = A2Z.get(ch, 0)
-        if n: total += ((n - 1) % 9) + 1
-    return total
+def english_ordinal(s: str) -> int: return _calc(s, 'english_ordinal')
 
-def reverse_ordinal(s: str) -> int:
-    t = _letters(s); return sum(Z2A.get(ch, 0) for ch in t)
+def full_reduction(s: str) -> int: return _calc(s, 'full_reduction')
 
-def reverse_reduction(s: str) -> int:
-    t = _letters(s); total = 0
-    for ch in t:
-        n = Z2A.get(ch, 0)
-        if n: total += ((n - 1) % 9) + 1
-    return total
+def reverse_ordinal(s: str) -> int: return _calc(s, 'reverse_ordinal')
 
-def sumerian(s: str) -> int:
-    return english_ordinal(s) * 6
+def reverse_reduction(s: str) -> int: return _calc(s, 'reverse_reduction')
+
+def sumerian(s: str) -> int: return _calc(s, 'sumerian')
 
 CALC_FUNCS = {
     'english_ordinal': english_ordinal,
@@ -36,3 +48,17 @@ CALC_FUNCS = {
     'reverse_reduction': reverse_reduction,
     'sumerian': sumerian,
 }
+
+def batch_values(phrases: List[str], calculators: Optional[List[str]] = None) -> Dict[str, List[int]]:
+    # one letter-stripping pass per phrase, then one vectorized table lookup per calculator
+    calculators = calculators or CALCULATORS
+    blobs = [_letter_bytes(p) for p in phrases]
+    if not blobs: return {c: [] for c in calculators}
+    buf = np.frombuffer(b"".join(blobs), dtype=np.uint8)
+    ends = np.cumsum(np.fromiter(map(len, blobs), dtype=np.int64, count=len(blobs)))
+    starts = ends - np.fromiter(map(len, blobs), dtype=np.int64, count=len(blobs))
+    out = {}
+    for c in calculators:
+        cs = np.concatenate(([0], np.cumsum(_NP_TABLES[c][buf])))
+        out[c] = (cs[ends] - cs[starts]).tolist()
+    return out
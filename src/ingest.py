@@ -1,38 +1,91 @@
-
-import time, re, feedparser
+import time, re, json, feedparser
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any
-from .config import RSS_FEEDS, MIN_TITLE_LEN, DEFAULT_LOOKBACK_DAYS
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from .config import RSS_FEEDS, MIN_TITLE_LEN, DEFAULT_LOOKBACK_DAYS, FEED_WORKERS, FEED_STATE_PATH
 
 def _normalize_url(u: str) -> str:
     if not u: return u
     return re.sub(r"[?&](utm_[^=]+|ocid|cmpid|ito|CMP|ref)=[^&]+", "", u)
 
-def fetch_feed_entries(lookback_days: int = DEFAULT_LOOKBACK_DAYS, rss_feeds=None) -> List[Dict[str, Any]]:
+def load_feed_state(path: Optional[str]) -> Dict[str, Any]:
+    if not path: return {}
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+def save_feed_state(state: Dict[str, Any], path: Optional[str]) -> None:
+    if not path: return
+    p = Path(path); tmp = p.with_suffix(p.suffix + ".tmp")
+    try:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(state, ensure_ascii=False))
+        tmp.replace(p)
+    except OSError:
+        pass
+
+def _entry_record(e) -> Dict[str, Any]:
+    published = None
+    if getattr(e, 'published_parsed', None):
+        published = datetime.fromtimestamp(time.mktime(e.published_parsed), tz=timezone.utc)
+    elif getattr(e, 'updated_parsed', None):
+        published = datetime.fromtimestamp(time.mktime(e.updated_parsed), tz=timezone.utc)
+    return {'link': _normalize_url(getattr(e, 'link', '') or ''),
+            'title': getattr(e, 'title', '') or '',
+            'published': published.isoformat() if published else None}
+
+def poll_feed(url: str, prev: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    # returns the feed's state (validators, source title, raw entries) or None if it couldn't be read;
+    # a 304 hands back the previous entries without parsing anything
+    prev = prev or {}
+    try:
+        feed = feedparser.parse(url, etag=prev.get('etag'), modified=prev.get('modified'))
+    except Exception:
+        return None
+    status = getattr(feed, 'status', None)
+    if status == 304 and 'entries' in prev:
+        return prev
+    # unreachable, an HTTP error, or a page that isn't a feed (a consent wall or error page served as 200):
+    # report a failure so the caller keeps the previous validators and entries instead of an empty feed
+    if not feed.entries and (status is None or status >= 400 or not feed.get('version')):
+        return None
+    return {'etag': getattr(feed, 'etag', None), 'modified': getattr(feed, 'modified', None),
+            'source': getattr(feed.feed, 'title', None) or url,
+            'entries': [_entry_record(e) for e in feed.entries]}
+
+def feed_items(feed: Dict[str, Any], cutoff: datetime, seen_links: set) -> List[Dict[str, Any]]:
+    # a polled feed's entries that pass the title and lookback filters and weren't taken from an earlier feed
+    items = []
+    for e in feed['entries']:
+        link = e['link']
+        if not link or link in seen_links: continue
+        title = e['title']
+        if len(title.strip()) < MIN_TITLE_LEN: continue
+        published = datetime.fromisoformat(e['published']) if e['published'] else None
+        if published and published < cutoff: continue
+        items.append({
+            'title': title.strip(),
+            'link': link,
+            'published': e['published'],
+            'source': feed['source'],
+        })
+        seen_links.add(link)
+    return items
+
+def fetch_feed_entries(lookback_days: int = DEFAULT_LOOKBACK_DAYS, rss_feeds=None, workers: int = FEED_WORKERS,
+                       state_path: Optional[str] = FEED_STATE_PATH) -> List[Dict[str, Any]]:
     rss_feeds = rss_feeds or RSS_FEEDS
     cutoff = datetime.now(timezone.utc) - timedelta(days=lookback_days)
+    state = load_feed_state(state_path)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        polled = list(pool.map(lambda u: poll_feed(u, state.get(u)), rss_feeds))
+    # merge in feed order so dedup and ordering match a sequential poll
     all_items, seen_links = [], set()
-    for url in rss_feeds:
-        try:
-            feed = feedparser.parse(url)
-        except Exception:
-            continue
-        for e in feed.entries:
-            link = _normalize_url(getattr(e, 'link', '') or '')
-            if not link or link in seen_links: continue
-            title = getattr(e, 'title', '') or ''
-            if len(title.strip()) < MIN_TITLE_LEN: continue
-            published = None
-            if getattr(e, 'published_parsed', None):
-                published = datetime.fromtimestamp(time.mktime(e.published_parsed), tz=timezone.utc)
-            elif getattr(e, 'updated_parsed', None):
-                published = datetime.fromtimestamp(time.mktime(e.updated_parsed), tz=timezone.utc)
-            if published and published < cutoff: continue
-            all_items.append({
-                'title': title.strip(),
-                'link': link,
-                'published': published.isoformat() if published else None,
-                'source': getattr(feed.feed, 'title', None) or url,
-            })
-            seen_links.add(link)
+    for url, feed in zip(rss_feeds, polled):
+        if feed is None: continue
+        state[url] = feed
+        all_items += feed_items(feed, cutoff, seen_links)
+    save_feed_state(state, state_path)
     return all_items
@@ -0,0 +1,34 @@
+import json, sqlite3, hashlib, time
+from pathlib import Path
+from typing import Dict, Any, Optional
+from .config import LEDGER_PATH
+
+def entry_fingerprint(entry: Dict[str, Any]) -> str:
+    # what the feed tells us about an entry; a new title or publish time means it changed
+    body = "\x1f".join([entry.get('link') or '', entry.get('title') or '', entry.get('published') or ''])
+    return hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+class Ledger:
+    # processed feed entries and their decoded results, committed one article at a time
+    def __init__(self, path: str = LEDGER_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS processed (
+            link TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, processed_at REAL NOT NULL, result TEXT NOT NULL)""")
+        self._db.commit()
+
+    def is_current(self, entry: Dict[str, Any]) -> bool:
+        row = self._db.execute("SELECT fingerprint FROM processed WHERE link=?", (entry['link'],)).fetchone()
+        return row is not None and row[0] == entry_fingerprint(entry)
+
+    def record(self, entry: Dict[str, Any], result: Dict[str, Any]) -> None:
+        self._db.execute("INSERT OR REPLACE INTO processed VALUES (?,?,?,?)",
+                         (entry['link'], entry_fingerprint(entry), time.time(), json.dumps(result, ensure_ascii=False)))
+        self._db.commit()
+
+    def result(self, link: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute("SELECT result FROM processed WHERE link=?", (link,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self) -> None: self._db.close()
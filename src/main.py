@@ -1,99 +1,68 @@
-import argparse, json, os
+import argparse
 from pathlib import Path
-from datetime import datetime, timezone
-from dateutil import parser as dateutil_parser
 
-from .ingest import fetch_feed_entries
-from .parse_article import fetch_and_parse
-from .nlp_extract import extract_5w, entities_for_gematria
-from .gematria import CALC_FUNCS
-from .match import compute_values, find_matches
-from .numerology import date_numerology
-from .patterns import load_archetypes, archetype_hits, score_ritual_signature
-from .astrology import basic_astrology
+from .config import FETCH_WORKERS, ARTICLE_CACHE_PATH, NLP_PROCESSES, LEDGER_PATH, DECODE_PROCESSES, ARCHIVE_PATH, FUZZY_MATCHING, NEAR_DUPLICATES
+from .analytics import Corpus, summarize
+from .archive import Archive
+from .cache import ArticleCache
+from .ledger import Ledger
+from .pipeline import Pipeline, profiled
+from .report import write_json, write_markdown, write_timings, StreamingReport
+from .result_model import CompactResult, compact, expand
 
-def write_json(items, outdir: str) -> str:
-    p = Path(outdir) / f"report-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
-    p.write_text(json.dumps(items, ensure_ascii=False, indent=2))
-    return str(p)
-
-def write_markdown(items, outdir: str) -> str:
-    p = Path(outdir) / f"report-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.md"
-    parts = ["# Daily Decode Report\n"]
-    for it in items:
-        parts.append(f"## {it['title']}")
-        parts.append(f"Source: {it.get('source')} — Published: {it.get('published')}\nLink: {it.get('link')}\n")
-        fw = it["five_w"]
-        parts.append("**5W Summary**:")
-        parts.append(f"- Who: {', '.join(fw.get('who', []))}")
-        parts.append(f"- What: {', '.join(fw.get('what', []))}")
-        parts.append(f"- When: {', '.join(fw.get('when_parsed', []) or fw.get('when_mentions', []))}")
-        parts.append(f"- Where: {', '.join(fw.get('where', []))}")
-        parts.append(f"- Why: {fw.get('why') or '—'}\n")
-        parts.append("**Gematria Matches (top 10)**:")
-        if it["matches"]:
-            for m in it["matches"][:10]:
-                parts.append(f"- '{m['phrase']}' ↔ '{m['db_phrase']}' via {m['calculator']} = **{m['value']}**")
-        else:
-            parts.append("- (no exact numeric matches)")
-        pat = it["patterns"]
-        parts.append("\n**Patterns**:")
-        parts.append(f"- Score: {pat['score']} | Headline nums: {pat['headline_symbolic_numbers']} | Life path: {pat['life_path']} | Master day: {pat['master_day']}")
-        if it.get("astrology"):
-            parts.append(f"- Astrology (approx): Sun sign on date: {it['astrology'].get('sun_sign')}")
-        parts.append("\n---\n")
-    p.write_text("\n".join(parts))
-    return str(p)
-
-def run(days: int, max_articles: int, outdir: str, db_path: str, archetypes_path: str):
+def run(days: int, max_articles: int, outdir: str, db_path: str, archetypes_path: str, workers: int = FETCH_WORKERS,
+        cache_path: str = ARTICLE_CACHE_PATH, nlp_procs: int = NLP_PROCESSES, ledger_path: str = LEDGER_PATH,
+        incremental: bool = False, stream: bool = False, profile: str = None, procs: int = DECODE_PROCESSES,
+        archive_path: str = ARCHIVE_PATH, fuzzy: bool = FUZZY_MATCHING, near_dups: bool = NEAR_DUPLICATES):
     out = Path(outdir); out.mkdir(parents=True, exist_ok=True)
-    entries = fetch_feed_entries(lookback_days=days)[:max_articles]
-
-    # load built-in phrase DB and compute values on the fly
-    base_phr = json.loads(Path(db_path).read_text(encoding="utf-8"))
-    db_vals = {k: {name: func(k) for name, func in CALC_FUNCS.items()} for k in base_phr.keys()}
-    arch = load_archetypes(archetypes_path)
-
-    results = []
-    for e in entries:
-        try:
-            parsed = fetch_and_parse(e["link"])
-        except Exception:
-            continue
-        title = parsed.get("title") or e["title"]
-        text = parsed.get("text") or ""
-        published = parsed.get("published") or e.get("published")
-        five_w = extract_5w(text, title=title, ref_date_iso=published)
-
-        # choose a date to analyze
-        dt = datetime.now(timezone.utc)
-        if published:
-            try:
-                dt = dateutil_parser.parse(published)
-                if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
-            except Exception:
-                pass
+    with profiled(profile, outdir):
+        pipe = Pipeline(db_path, archetypes_path, workers=workers, nlp_procs=nlp_procs, procs=procs, fuzzy=fuzzy, near_dups=near_dups,
+                        cache=ArticleCache(cache_path) if cache_path else None)
+        entries = pipe.feeds(days)[:max_articles]
 
-        phrases = entities_for_gematria(title, text)
-        values_map = compute_values(phrases, ["english_ordinal","full_reduction","reverse_ordinal","reverse_reduction","sumerian"], CALC_FUNCS)
-        matches = find_matches(values_map, db_vals)
+        # the ledger checkpoints every decoded article; --incremental skips entries it already has unchanged
+        ledger = Ledger(ledger_path) if ledger_path else None
+        todo = [e for e in entries if not (incremental and ledger is not None and ledger.is_current(e))]
 
-        dnum = date_numerology(dt)
-        arch_hits = archetype_hits(title + "\n" + text[:5000], arch)
-        pat = score_ritual_signature(title, text, num_matches=len(matches), date_info=dnum)
-        pat["archetype_hits"] = arch_hits
-        astro = basic_astrology(dt)
+        # streaming writes each article the moment it's decoded and keeps no results; the pipeline holds one
+        # chunk of articles (a bounded queue with --procs), so memory stays flat however many entries there are
+        writer = StreamingReport(outdir) if stream else None
+        archive = Archive(archive_path) if archive_path else None
+        results, corpus = [], Corpus()
+        if writer is not None and incremental and ledger is not None:
+            todo_links = {e["link"] for e in todo}
+            for e in entries:
+                if e["link"] not in todo_links and (r := ledger.result(e["link"])) is not None:
+                    writer.add(r); corpus.add(r)
+        for e, item in pipe.run(todo):
+            with pipe.stage("write") as st:
+                if writer is not None: writer.add(item); corpus.add(item)
+                else: results.append(CompactResult.from_dict(item))  # expanded again only by the writers
+                if ledger is not None: ledger.record(e, item)
+                if archive is not None: archive.add(item)
+                st["items"] += 1
+        if archive is not None:
+            with pipe.stage("write"):
+                archive.commit(); archive.close()
 
-        results.append({
-            "title": title, "link": e["link"], "source": e.get("source"),
-            "published": published, "authors": parsed.get("authors"),
-            "five_w": five_w, "phrases": phrases, "values": values_map,
-            "matches": matches, "numerology": dnum, "patterns": pat, "astrology": astro
-        })
+        if writer is not None:
+            with pipe.stage("analytics"):
+                summary = summarize(corpus)
+            timings = pipe.timings()
+            writer.close(timings, analytics=summary)
+            print("Wrote:", writer.jsonl_path, writer.md_path, write_timings(timings, writer.jsonl_path))
+            return
+        if incremental and ledger is not None:
+            # merge with earlier runs: every entry in the window that has a decoded result, in feed order
+            results = compact(r for r in (ledger.result(e["link"]) for e in entries) if r is not None)
 
-    jpath = write_json(results, outdir)
-    mpath = write_markdown(results, outdir)
-    print("Wrote:", jpath, mpath)
+        with pipe.stage("analytics"):
+            summary = summarize(Corpus.from_items(expand(results)))
+        with pipe.stage("write"):
+            jpath = write_json(expand(results), outdir)
+        timings = pipe.timings()
+        mpath = write_markdown(expand(results), outdir, timings=timings, analytics=summary)
+        print("Wrote:", jpath, mpath, write_timings(timings, jpath))
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
@@ -102,5 +71,20 @@ if __name__ == "__main__":
     ap.add_argument("--out", type=str, default="docs")
     ap.add_argument("--db", type=str, default="database/phrases.json")
     ap.add_argument("--archetypes", type=str, default="database/archetypes.json")
+    ap.add_argument("--workers", type=int, default=FETCH_WORKERS)
+    ap.add_argument("--cache", type=str, default=ARTICLE_CACHE_PATH, help="article cache path ('' disables)")
+    ap.add_argument("--nlp-procs", type=int, default=NLP_PROCESSES, help="spaCy worker processes")
+    ap.add_argument("--procs", type=int, default=DECODE_PROCESSES, help="decode processes overlapped with fetching (0 = one per core)")
+    ap.add_argument("--ledger", type=str, default=LEDGER_PATH, help="processed-articles ledger path ('' disables)")
+    ap.add_argument("--archive", type=str, default=ARCHIVE_PATH, help="archive of decoded articles across runs ('' disables)")
+    ap.add_argument("--fuzzy", action="store_true", default=FUZZY_MATCHING, help="also match phrases to DB phrases by text (rapidfuzz)")
+    ap.add_argument("--keep-duplicates", action="store_true", help="decode every copy of a story carried by several feeds")
+    ap.add_argument("--incremental", action="store_true", help="only decode entries that are new or changed since the last run")
+    ap.add_argument("--stream", action="store_true", help="write NDJSON + Markdown per article as it finishes")
+    ap.add_argument("--profile", choices=["cprofile", "pyinstrument"], default=None, help="profile the run into --out")
     args = ap.parse_args()
-    run(args.days, args.max_articles, args.out, args.db, args.archetypes)
+    if args.incremental and not args.ledger: ap.error("--incremental needs a --ledger")
+    run(args.days, args.max_articles, args.out, args.db, args.archetypes, workers=args.workers, cache_path=args.cache,
+        nlp_procs=args.nlp_procs, ledger_path=args.ledger, incremental=args.incremental, stream=args.stream,
+        profile=args.profile, procs=args.procs, archive_path=args.archive, fuzzy=args.fuzzy,
+        near_dups=NEAR_DUPLICATES and not args.keep_duplicates)
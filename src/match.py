@@ -1,19 +1,99 @@
-
 from typing import Dict, Any, List
+from .config import FUZZY_SCORER, FUZZY_SCORE_CUTOFF, FUZZY_LIMIT, FUZZY_WORKERS, FUZZY_CHUNK
+from .gematria import CALC_FUNCS, batch_values
 
 def compute_values(phrases: List[str], calculators: List[str], calcs) -> Dict[str, Dict[str, int]]:
+    # built-in calculators go through the batched engine; custom ones are called per phrase
+    batched = [c for c in calculators if calcs[c] is CALC_FUNCS.get(c)]
+    cols = batch_values(phrases, batched) if batched else {}
     out={}
-    for p in phrases:
+    for j, p in enumerate(phrases):
         out[p]={}
         for calc in calculators:
-            out[p][calc]=calcs[calc](p)
+            out[p][calc]=cols[calc][j] if calc in cols else calcs[calc](p)
     return out
 
-def find_matches(values_map: Dict[str, Dict[str, int]], db_values: Dict[str, Dict[str, int]]) -> List[Dict[str, Any]]:
+class ValueIndex:
+    # value -> ids of the DB phrases carrying it under any calculator (a match needs no more than that)
+    def __init__(self, db_values: Dict[str, Dict[str, int]]):
+        self.names = list(db_values)
+        any_calc: Dict[int, List[int]] = {}
+        for i, name in enumerate(self.names):
+            for num in db_values[name].values():
+                ids = any_calc.setdefault(num, [])
+                if not ids or ids[-1] != i: ids.append(i)
+        self._any = any_calc
+
+    def __len__(self) -> int: return len(self.names)
+
+    def ids(self, num: int) -> List[int]:
+        return self._any.get(num, [])
+
+    def name(self, i: int) -> str: return self.names[i]
+
+def find_matches(values_map: Dict[str, Dict[str, int]], db_values) -> List[Dict[str, Any]]:
+    index = ValueIndex(db_values) if isinstance(db_values, dict) else db_values
     matches=[]
     for phrase, vals in values_map.items():
-        for db_phrase, dbv in db_values.items():
+        # a phrase value matches a DB phrase carrying that value under any calculator
+        carried: Dict[int, set] = {}
+        for num in set(vals.values()):
+            for i in index.ids(num):
+                carried.setdefault(i, set()).add(num)
+        for i in sorted(carried):
+            db_phrase, nums = index.name(i), carried[i]
             for calc, num in vals.items():
-                if num in dbv.values():
+                if num in nums:
                     matches.append({'phrase': phrase, 'db_phrase': db_phrase, 'calculator': calc, 'value': num})
     return matches
+
+class FuzzyIndex:
+    # DB phrase names normalized once for rapidfuzz, plus a word -> names inverted index (numpy CSR).
+    # A lookup scores only the names sharing at least one word with the phrases, in one cdist call per
+    # FUZZY_CHUNK candidates (parallel, in C), so its cost follows the candidates rather than the DB size.
+    # Pairs with no word in common ("Mars" ~ "Marseille") are never scored
+    def __init__(self, names: List[str], scorer: str = FUZZY_SCORER, chunk: int = FUZZY_CHUNK):
+        import numpy as np
+        from rapidfuzz import fuzz, utils
+        self.names, self.chunk = names, chunk
+        self._scorer, self._process = getattr(fuzz, scorer), utils.default_process
+        self._choices = [self._process(n) for n in names]
+        self._vocab: Dict[str, int] = {}
+        tids, ids = [], []
+        for i, c in enumerate(self._choices):
+            for w in set(c.split()):
+                tids.append(self._vocab.setdefault(w, len(self._vocab))); ids.append(i)
+        tids_a = np.array(tids, dtype=np.int32)
+        order = np.argsort(tids_a, kind="stable")
+        self._postings = np.array(ids, dtype=np.int32)[order]
+        self._indptr = np.zeros(len(self._vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tids_a, minlength=len(self._vocab)), out=self._indptr[1:])
+
+    def __len__(self) -> int: return len(self.names)
+
+    def candidates(self, queries: List[str]):
+        import numpy as np
+        spans = [self._postings[self._indptr[t]:self._indptr[t + 1]]
+                 for t in {self._vocab[w] for q in queries for w in q.split() if w in self._vocab}]
+        return np.unique(np.concatenate(spans)) if spans else np.empty(0, dtype=np.int32)
+
+    def match(self, phrases: List[str], cutoff: float = FUZZY_SCORE_CUTOFF, limit: int = FUZZY_LIMIT,
+              workers: int = FUZZY_WORKERS) -> List[Dict[str, Any]]:
+        # best `limit` DB phrases scoring >= cutoff for each phrase, highest score first
+        import numpy as np
+        from rapidfuzz import process
+        queries = [(j, q) for j, q in enumerate(self._process(p) for p in phrases) if q]
+        if not queries: return []
+        cand = self.candidates([q for _, q in queries])
+        hits: Dict[int, List[tuple]] = {j: [] for j, _ in queries}
+        for lo in range(0, len(cand), self.chunk):
+            block = cand[lo:lo + self.chunk]
+            scores = process.cdist([q for _, q in queries], [self._choices[i] for i in block], scorer=self._scorer,
+                                   score_cutoff=cutoff, dtype=np.uint8, workers=workers)
+            for r, c in zip(*np.nonzero(scores)):
+                hits[queries[r][0]].append((-int(scores[r, c]), int(block[c])))
+        out = []
+        for j, _ in queries:
+            for neg, i in sorted(hits[j])[:limit]:
+                out.append({'phrase': phrases[j], 'db_phrase': self.names[i], 'score': -neg})
+        return out
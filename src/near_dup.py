@@ -0,0 +1,70 @@
+import re
+from collections import deque
+from hashlib import blake2b
+from typing import Dict, Hashable, List, Optional, Tuple
+import numpy as np
+from .config import (NEAR_DUP_THRESHOLD, NEAR_DUP_MIN_WORDS, NEAR_DUP_SHINGLE, NEAR_DUP_PERMUTATIONS, NEAR_DUP_BAND_ROWS,
+                     NEAR_DUP_WINDOW)
+
+_WORD = re.compile(r"\w+")
+
+def shingles(text: str, k: int = NEAR_DUP_SHINGLE) -> np.ndarray:
+    # 64-bit hashes of the text's distinct k-word shingles
+    words = _WORD.findall(text.lower())
+    grams = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return np.frombuffer(b"".join(blake2b(g.encode(), digest_size=8).digest() for g in grams), dtype="<u8")
+
+class NearDuplicates:
+    # the first article of a story is its canonical copy; a later one whose title + text shingles overlap it
+    # by at least `threshold` (Jaccard, estimated from MinHash signatures) is the same story. Signatures are
+    # cut into bands of `rows` values and only articles sharing a band are compared, so a check costs
+    # about the same however many articles came before. Only the latest `window` canonical copies are kept;
+    # older ones are forgotten (their keys collect in `dropped` for the caller to let go of as well)
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, min_words: int = NEAR_DUP_MIN_WORDS,
+                 permutations: int = NEAR_DUP_PERMUTATIONS, rows: int = NEAR_DUP_BAND_ROWS, window: int = NEAR_DUP_WINDOW):
+        self.threshold, self.min_words, self.rows, self.window = threshold, min_words, rows, window
+        rng = np.random.default_rng(0x5eed)  # fixed, so signatures are comparable across instances
+        self._a = rng.integers(1, 2**63, permutations, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, permutations, dtype=np.uint64)
+        self._sigs: Dict[Hashable, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[Hashable]] = {}
+        self._order: "deque[Hashable]" = deque()
+        self.dropped: List[Hashable] = []
+        self.duplicates = 0
+
+    def __contains__(self, key: Hashable) -> bool: return key in self._sigs
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        h = shingles(text)
+        if not len(h): return None
+        # multiply-shift hashing: one cheap permutation of the shingle hashes per row of the signature
+        return ((h[:, None] * self._a + self._b) >> np.uint64(32)).min(axis=0)
+
+    def _bands(self, sig: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(i, sig[i:i + self.rows].tobytes()) for i in range(0, len(sig), self.rows)]
+
+    def check(self, key: Hashable, title: str, text: str) -> Optional[Hashable]:
+        # the canonical copy's key if this article is a near duplicate; otherwise it is registered as
+        # canonical under `key` and None comes back. Stubs too short to compare are never matched
+        if len(_WORD.findall(text)) < self.min_words: return None
+        sig = self.signature(title + "\n" + text)
+        if sig is None: return None
+        bands = self._bands(sig)
+        seen = set()
+        for band in bands:
+            for other in self._buckets.get(band, ()):
+                if other in seen: continue
+                seen.add(other)
+                if (self._sigs[other] == sig).mean() >= self.threshold:
+                    self.duplicates += 1
+                    return other
+        self._sigs[key] = sig
+        for band in bands: self._buckets.setdefault(band, []).append(key)
+        self._order.append(key)
+        while len(self._order) > self.window:
+            old = self._order.popleft()
+            for band in self._bands(self._sigs.pop(old)):
+                keys = self._buckets[band]; keys.remove(old)
+                if not keys: del self._buckets[band]
+            self.dropped.append(old)
+        return None
@@ -1,61 +1,118 @@
-
-from typing import Dict, Any, List
-import re, dateparser
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Tuple
+import re, threading
 from collections import Counter
-import spacy
-from .config import WHY_MARKERS
+from .config import WHY_MARKERS, NLP_MAX_CHARS, GEMATRIA_MAX_CHARS, NLP_MODEL, NLP_MODE
+from .dates import parse_when_many
 
+# spaCy (and, in .dates, dateparser) are imported on first use so importing this module stays cheap
 _NLP=None
-def nlp():
+_NLP_LOCK=threading.Lock()
+
+def _load(model: str, mode: str, install_missing: bool = False):
+    import spacy
+    # we read ents, pos_ and sentence boundaries; 'fast' drops the lemmatizer and swaps the parser for senter
+    exclude = ['lemmatizer', 'parser'] if mode == 'fast' else []
+    try:
+        pipe = spacy.load(model, exclude=exclude)
+    except OSError:
+        if not install_missing: raise
+        from spacy.cli import download
+        download(model)
+        pipe = spacy.load(model, exclude=exclude)
+    if mode == 'fast' and 'senter' in pipe.disabled:
+        pipe.enable_pipe('senter')
+    return pipe
+
+def nlp(install_missing: bool = False):
     global _NLP
     if _NLP is None:
-        _NLP = spacy.load('en_core_web_sm')
+        with _NLP_LOCK:
+            if _NLP is None:
+                _NLP = _load(NLP_MODEL, NLP_MODE, install_missing)
     return _NLP
 
+def warm_up(install_missing: bool = False) -> threading.Thread:
+    # load (and optionally download) the model on a background thread; nlp() callers block until it's ready
+    def _run():
+        try: nlp(install_missing)
+        except Exception: pass
+    t = threading.Thread(target=_run, name="nlp-warm-up", daemon=True)
+    t.start()
+    return t
+
 def top_entities(doc, labels: List[str], k: int = 5) -> List[str]:
     items = [ent.text.strip() for ent in doc.ents if ent.label_ in labels and len(ent.text.strip())>1]
     counts = Counter(items)
     return [t for t,_ in counts.most_common(k)]
 
-def extract_5w(text: str, title: str = '', ref_date_iso: str = None) -> Dict[str, Any]:
-    d = nlp()(text if len(text) < 200000 else text[:200000])
+def _nouns(tokens) -> List[str]:
+    return [t.text for t in tokens if t.pos_ in ('NOUN','PROPN') and len(t.text)>2]
+
+def five_w_from_docs(d, td=None, ref_date_iso: str = None) -> Dict[str, Any]:
     who = top_entities(d, ['PERSON','ORG'], k=5)
     where = top_entities(d, ['GPE','LOC'], k=5)
     when = top_entities(d, ['DATE','TIME'], k=5)
 
-    what=[]
-    if title:
-        td = nlp()(title)
-        what = [t.text for t in td if t.pos_ in ('NOUN','PROPN') and len(t.text)>2]
-    if not what and list(d.sents):
-        s0 = list(d.sents)[0].text
-        sd = nlp()(s0)
-        what = [t.text for t in sd if t.pos_ in ('NOUN','PROPN') and len(t.text)>2]
+    sents = list(d.sents)
+    what = _nouns(td) if td is not None else []
+    if not what and sents:
+        what = _nouns(sents[0])
 
     why=None
-    for s in list(d.sents)[:3]:
+    for s in sents[:3]:
         s_low = s.text.lower()
         if any(f" {m} " in f" {s_low} " for m in WHY_MARKERS):
             why = s.text.strip(); break
 
-    parsed_dates=[]
-    for frag in when[:5]:
-        dt = dateparser.parse(frag, settings={'RELATIVE_BASE': None})
-        if dt: parsed_dates.append(dt.isoformat())
+    parsed_dates = parse_when_many(when[:5], ref_date_iso)
 
     return {'who': who, 'what': list(dict.fromkeys(what))[:6], 'when_mentions': when,
             'when_parsed': parsed_dates, 'where': where, 'why': why}
 
-def entities_for_gematria(title: str, text: str) -> List[str]:
-    d = nlp()(title + "\n" + text[:4000])
+def gematria_phrases_from_docs(d, td, limit_chars: int = GEMATRIA_MAX_CHARS) -> List[str]:
+    # title entities first, then body entities that start inside the first limit_chars characters
     keep = {'PERSON','ORG','GPE','EVENT','WORK_OF_ART','LAW','PRODUCT'}
-    cand = [ent.text.strip() for ent in d.ents if ent.label_ in keep and len(ent.text.strip())>2]
+    ents = list(td.ents) + [ent for ent in d.ents if ent.start_char < limit_chars]
+    cand = [ent.text.strip() for ent in ents if ent.label_ in keep and len(ent.text.strip())>2]
     seen=set(); out=[]
     for c in cand:
         key = re.sub(r"\s+"," ", c.lower())
         if key not in seen: seen.add(key); out.append(c)
-    td = nlp()(title)
-    nouns=[t.text for t in td if t.pos_ in ('NOUN','PROPN') and len(t.text)>2]
-    for n in nouns:
+    for n in _nouns(td):
         if n.lower() not in seen: out.append(n)
     return out[:20]
+
+def extract_5w(text: str, title: str = '', ref_date_iso: str = None) -> Dict[str, Any]:
+    d = nlp()(text[:NLP_MAX_CHARS])
+    return five_w_from_docs(d, nlp()(title) if title else None, ref_date_iso)
+
+def entities_for_gematria(title: str, text: str) -> List[str]:
+    return gematria_phrases_from_docs(nlp()(text[:GEMATRIA_MAX_CHARS]), nlp()(title))
+
+def analyze_article(title: str, text: str, ref_date_iso: str = None) -> Tuple[Dict[str, Any], List[str]]:
+    td, d = nlp()(title), nlp()(text[:NLP_MAX_CHARS])
+    return five_w_from_docs(d, td if title else None, ref_date_iso), gematria_phrases_from_docs(d, td)
+
+def analyze_articles(items: Iterable[Tuple[str, str, Optional[str]]], n_process: int = 1,
+                     batch_size: int = 16) -> Iterator[Any]:
+    # items are (title, text, ref_date_iso); yields (five_w, gematria phrases) lazily, in input order.
+    # titles and bodies go through one nlp.pipe stream so spaCy can batch (and fork) across articles.
+    # spaCy reads ahead, so when the stream fails the article that broke it can be anywhere in the batch it
+    # was working on: that stretch is redone one article at a time, the culprit's exception is yielded in
+    # its place, and a new stream takes over after it
+    items, k = list(items), 0
+    while k < len(items):
+        texts = (t for title, text, _ in items[k:] for t in (title, text[:NLP_MAX_CHARS]))
+        docs = nlp().pipe(texts, batch_size=batch_size, n_process=n_process)
+        try:
+            for (title, _, ref), td, d in zip(items[k:], docs, docs):
+                out = five_w_from_docs(d, td if title else None, ref), gematria_phrases_from_docs(d, td)
+                k += 1
+                yield out
+            return
+        except Exception:
+            for title, text, ref in items[k:k + batch_size]:
+                try: out = analyze_article(title, text, ref)
+                except Exception as exc: out = exc
+                k += 1
+                yield out
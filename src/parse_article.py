@@ -1,20 +1,90 @@
 
-from typing import Dict, Any
-import requests
-from bs4 import BeautifulSoup
-from readability import Document
-try:
-    from newspaper import Article
-except Exception:
-    Article = None
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import codecs, copy, re, threading, time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
 from dateutil import parser as dateutil_parser
+from .config import FETCH_WORKERS, FETCH_PER_HOST, FETCH_DEADLINE_SECONDS, FETCH_TIMEOUT_SECONDS, FETCH_MAX_BYTES
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; NewsDecoder/1.0)"}
 
+_ARTICLE = False
+def _article_cls():
+    # newspaper is optional and slow to import, so resolve it on first fetch
+    global _ARTICLE
+    if _ARTICLE is False:
+        try:
+            from newspaper import Article
+        except Exception:
+            Article = None
+        _ARTICLE = Article
+    return _ARTICLE
+
+_SESSION, _SESSION_POOL = None, 0
+_SESSION_LOCK = threading.Lock()
+def _session(workers: int = 1):
+    # one keep-alive session for every article fetch; its connection pool grows to the most fetch workers asked for
+    global _SESSION, _SESSION_POOL
+    if _SESSION is None or _SESSION_POOL < workers:
+        with _SESSION_LOCK:
+            import requests
+            if _SESSION is None:
+                _SESSION = requests.Session(); _SESSION.headers.update(HEADERS)
+            if _SESSION_POOL < workers:
+                adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+                _SESSION.mount("http://", adapter); _SESSION.mount("https://", adapter)
+                _SESSION_POOL = workers
+    return _SESSION
+
+_CHARSET = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+def download(url: str, max_bytes: int = FETCH_MAX_BYTES) -> str:
+    # the page as text, streamed and cut off at max_bytes; non-HTML responses (PDFs, images) are refused
+    with _session().get(url, timeout=FETCH_TIMEOUT_SECONDS, stream=True) as resp:
+        resp.raise_for_status()
+        ctype = resp.headers.get("Content-Type", "")
+        if ctype and not any(t in ctype for t in ("html", "xml", "text/plain")):
+            raise ValueError(f"not a web page: {ctype}")
+        body, cut = bytearray(), False
+        for chunk in resp.iter_content(64 * 1024):
+            body += chunk
+            if len(body) >= max_bytes:
+                del body[max_bytes:]; cut = True; break
+
+    def decode(encoding: str, errors: str = "strict") -> str:
+        # a page cut off at max_bytes may end partway through a character; that fragment is dropped
+        return codecs.getincrementaldecoder(encoding)(errors).decode(bytes(body), final=not cut)
+    m = _CHARSET.search(ctype)
+    if m:
+        try: return decode(m.group(1), "replace")
+        except LookupError: pass
+    try: return decode("utf-8")
+    except UnicodeDecodeError:
+        from readability.encoding import get_encoding
+        return decode(get_encoding(bytes(body)), "replace")
+
+@lru_cache(maxsize=1)
+def _tree_document():
+    from readability import Document
+    from readability.cleaners import html_cleaner
+    class TreeDocument(Document):
+        # readability re-parses and re-cleans its input on every title()/summary() call; start from the page's
+        # tree instead and clean it once. The cleaner works on a copy, so the shared tree stays intact for the
+        # metadata lookups, and each call gets its own copy of the cleaned one because summary() mutates it
+        _cleaned = None
+        def _parse(self, tree):
+            if self._cleaned is None:
+                self._cleaned = html_cleaner.clean_html(tree)
+                self._cleaned.resolve_base_href(handle_failures="discard")
+            return copy.deepcopy(self._cleaned)
+    return TreeDocument
+
 def fetch_and_parse(url: str) -> Dict[str, Any]:
+    html = download(url)
+    Article = _article_cls()
     if Article is not None:
         try:
-            art = Article(url); art.download(); art.parse()
+            art = Article(url); art.download(input_html=html); art.parse()
             text = (art.text or '').strip(); title = (art.title or '').strip()
             authors = art.authors or []; published = None
             if art.publish_date: published = art.publish_date.isoformat()
@@ -22,16 +92,73 @@ def fetch_and_parse(url: str) -> Dict[str, Any]:
                 return {'title': title, 'authors': authors, 'text': text, 'published': published, 'top_image': getattr(art,'top_image',None)}
         except Exception:
             pass
-    resp = requests.get(url, headers=HEADERS, timeout=15); resp.raise_for_status()
-    doc = Document(resp.text); title = (doc.short_title() or '').strip()
-    html = doc.summary(); soup = BeautifulSoup(html, 'lxml')
-    for tag in soup(['script','style','noscript']): tag.decompose()
-    paragraphs = [p.get_text(" ", strip=True) for p in soup.find_all('p')]
-    text = "\n".join([p for p in paragraphs if p])
+    import lxml.html
+    from readability.htmls import utf8_parser
+    tree = lxml.html.document_fromstring(html.encode('utf-8', 'replace'), parser=utf8_parser)
     published = None
     try:
-        soup_full = BeautifulSoup(resp.text, 'lxml')
-        meta = soup_full.find('meta', {'property':'article:published_time'}) or soup_full.find('meta', {'name':'date'})
-        if meta and meta.get('content'): published = dateutil_parser.parse(meta['content']).isoformat()
+        metas = tree.xpath('//meta[@property="article:published_time"]/@content') or tree.xpath('//meta[@name="date"]/@content')
+        if metas and metas[0].strip(): published = dateutil_parser.parse(metas[0]).isoformat()
     except Exception: pass
+    doc = _tree_document()(tree); title = (doc.short_title() or '').strip()
+    summary = lxml.html.fragment_fromstring(doc.summary(html_partial=True), create_parent='div')
+    for tag in summary.xpath('.//script|.//style|.//noscript'): tag.drop_tree()
+    paragraphs = [" ".join(s.strip() for s in p.itertext() if s.strip()) for p in summary.iter('p')]
+    text = "\n".join([p for p in paragraphs if p])
     return {'title': title, 'authors': [], 'text': text, 'published': published, 'top_image': None}
+
+def iter_fetch(urls: List[str], workers: int = FETCH_WORKERS, per_host: int = FETCH_PER_HOST,
+               deadline: float = FETCH_DEADLINE_SECONDS, cache=None) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    # yields (index, parsed) once for every url as soon as it's ready, cache hits first; failures and anything
+    # unfinished at the deadline come back as None. the deadline only runs while waiting on downloads here, not
+    # while the caller holds on to a yielded result. with an ArticleCache, new results are stored
+    cached = [cache.get(u) for u in urls] if cache is not None else [None] * len(urls)
+    todo = []
+    for i, r in enumerate(cached):
+        if r is None: todo.append(i)
+        else: yield i, r
+    if not todo: return
+    if deadline <= 0:  # out of time: nothing new is fetched
+        for i in todo: yield i, None
+        return
+    by_host: Dict[str, List[int]] = {}
+    for i in todo:
+        by_host.setdefault(urlsplit(urls[i]).netloc.lower(), []).append(i)
+    host_locks = {h: threading.BoundedSemaphore(max(1, per_host)) for h in by_host}
+
+    def work(i):
+        with host_locks[urlsplit(urls[i]).netloc.lower()]:
+            return fetch_and_parse(urls[i])
+
+    # submit round-robin across hosts so one busy host doesn't park every worker on its semaphore
+    queues = list(by_host.values()); order = []
+    while queues:
+        order += [q.pop(0) for q in queues]
+        queues = [q for q in queues if q]
+    _session(max(1, workers))  # enough pooled connections for every worker
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    futs = {pool.submit(work, i): i for i in order}
+    left = deadline
+    try:
+        while futs:
+            t = time.monotonic()
+            done, _ = wait(futs, timeout=max(0.0, left), return_when=FIRST_COMPLETED)  # everything done so far
+            left -= time.monotonic() - t
+            if not done: break
+            for f in done:
+                i = futs.pop(f)
+                try: r = f.result()
+                except Exception: r = None
+                if r is not None and cache is not None: cache.put(urls[i], r)
+                yield i, r
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    for i in futs.values(): yield i, None
+
+def fetch_many(urls: List[str], workers: int = FETCH_WORKERS, per_host: int = FETCH_PER_HOST,
+               deadline: float = FETCH_DEADLINE_SECONDS, cache=None) -> List[Optional[Dict[str, Any]]]:
+    # results line up with urls; failures and anything unfinished at the deadline come back as None
+    out: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+    for i, r in iter_fetch(urls, workers=workers, per_host=per_host, deadline=deadline, cache=cache):
+        out[i] = r
+    return out
@@ -1,6 +1,7 @@
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import re, json
+from functools import lru_cache
 from .config import SYMBOLIC_NUMBERS
 
 def load_archetypes(path: str) -> List[str]:
@@ -11,17 +12,65 @@ def headline_number_hits(title: str) -> List[int]:
     nums = [int(x) for x in re.findall(r"\b\d+\b", title)]
     return [n for n in nums if n in SYMBOLIC_NUMBERS]
 
-def archetype_hits(text: str, archetypes: List[str]) -> List[str]:
-    t = text.lower()
-    hits=[]
-    for w in archetypes:
-        if len(w)<3: continue
-        if re.search(rf"\b{re.escape(w.lower())}\b", t):
-            hits.append(w)
-    seen=set(); out=[]
-    for h in hits:
-        if h not in seen: out.append(h); seen.add(h)
-    return out[:20]
+_WORD = re.compile(r"\w")
+
+def _boundary(s: str, j: int) -> bool:
+    return bool(_WORD.match(s[j-1])) != bool(_WORD.match(s[j]))
+
+def _trie_pattern(words: List[str]) -> str:
+    # literal alternation factored into a trie; greedy optional tails try the longest word first
+    trie: Dict[str, Any] = {}
+    for w in words:
+        node = trie
+        for ch in w: node = node.setdefault(ch, {})
+        node[''] = {}
+    def emit(node) -> str:
+        alts = [re.escape(ch) + emit(sub) for ch, sub in sorted(node.items()) if ch]
+        if not alts: return ''
+        body = alts[0] if len(alts) == 1 else '(?:' + '|'.join(alts) + ')'
+        return f'(?:{body})?' if '' in node else body
+    return emit(trie)
+
+class ArchetypeMatcher:
+    # all archetypes compiled into one regex, scanned once per text with the same \b...\b semantics
+    # as matching each archetype on its own (overlapping and nested hits included)
+    def __init__(self, archetypes: List[str]):
+        self.archetypes = list(archetypes)
+        self._keys: Dict[str, List[int]] = {}
+        for i, w in enumerate(self.archetypes):
+            if len(w) < 3: continue
+            self._keys.setdefault(w.lower(), []).append(i)
+        # a hit on k is also a hit on every shorter key that is a prefix of k ending on a word boundary
+        self._prefixes = {k: [k[:j] for j in range(1, len(k)) if k[:j] in self._keys and _boundary(k, j)]
+                          for k in self._keys}
+        self._rx = re.compile(r"(?=\b(" + _trie_pattern(list(self._keys)) + r")\b)") if self._keys else None
+
+    def scan(self, text: str) -> Dict[str, List[int]]:
+        # archetype -> start offsets in the lowercased text, in archetype-list order
+        found: Dict[str, List[int]] = {}
+        if self._rx is not None:
+            for m in self._rx.finditer(text.lower()):
+                k, pos = m.group(1), m.start()
+                found.setdefault(k, []).append(pos)
+                for p in self._prefixes[k]: found.setdefault(p, []).append(pos)
+        out: Dict[str, List[int]] = {}
+        for i in sorted(i for k in found for i in self._keys[k]):
+            w = self.archetypes[i]
+            if w not in out: out[w] = found[w.lower()]
+        return out
+
+@lru_cache(maxsize=8)
+def _matcher_for(archetypes: Tuple[str, ...]) -> ArchetypeMatcher:
+    return ArchetypeMatcher(list(archetypes))
+
+def compile_archetypes(archetypes: List[str]) -> ArchetypeMatcher:
+    return archetypes if isinstance(archetypes, ArchetypeMatcher) else _matcher_for(tuple(archetypes))
+
+def archetype_scan(text: str, archetypes) -> Dict[str, List[int]]:
+    return compile_archetypes(archetypes).scan(text)
+
+def archetype_hits(text: str, archetypes) -> List[str]:
+    return list(archetype_scan(text, archetypes))[:20]
 
 def score_ritual_signature(title: str, text: str, num_matches: int, date_info: Dict[str, Any]) -> Dict[str, Any]:
     n_hits = len(headline_number_hits(title))
@@ -0,0 +1,389 @@
+import hashlib, json, logging, os, queue, threading, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Iterator, Optional, Tuple
+from dateutil import parser as dateutil_parser
+
+from .config import (CALCULATORS, FETCH_WORKERS, FETCH_PER_HOST, FETCH_DEADLINE_SECONDS, FEED_STATE_PATH, NLP_PROCESSES, DEFAULT_LOOKBACK_DAYS, DECODE_PROCESSES, DECODE_QUEUE_SIZE, DECODE_CHUNK,
+                     FUZZY_MATCHING, NEAR_DUPLICATES, NLP_MODEL, NLP_MODE, FUZZY_SCORER, FUZZY_SCORE_CUTOFF, FUZZY_LIMIT)
+from .cache import content_hash
+from .ingest import fetch_feed_entries
+from .parse_article import fetch_many, iter_fetch
+from .nlp_extract import analyze_article, analyze_articles, warm_up
+from .gematria import CALC_FUNCS
+from .match import compute_values, find_matches, FuzzyIndex
+from .near_dup import NearDuplicates
+from .build_db import load_phrase_db
+from .calendar_table import calendar
+from .patterns import load_archetypes, compile_archetypes, score_ritual_signature
+
+log = logging.getLogger(__name__)
+
+STAGES = ["setup", "feeds", "fetch", "dedup", "reuse", "nlp", "gematria", "match", "fuzzy", "numerology", "patterns", "astrology", "analytics", "write"]
+
+def article_date(published: Optional[str]) -> datetime:
+    # the date we analyze: the article's publish time, or now when it has none (or it doesn't parse)
+    dt = datetime.now(timezone.utc)
+    if published:
+        try:
+            dt = dateutil_parser.parse(published)
+            if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
+        except Exception:
+            pass
+    return dt
+
+def article_fields(e: Dict[str, Any], parsed: Dict[str, Any]) -> Tuple[str, str, Optional[str]]:
+    # (title, text, published) of a fetched article, falling back to the feed entry
+    return parsed.get("title") or e["title"], parsed.get("text") or "", parsed.get("published") or e.get("published")
+
+def _reusable(item: Dict[str, Any]) -> Dict[str, Any]:
+    # the parts of a result that depend only on the article's title, text and date (and the decoder): shared
+    # by a canonical copy with its near duplicates, and cached by content hash across runs
+    return {k: item[k] for k in ("link", "five_w", "phrases", "values", "matches", "fuzzy_matches") if k in item}
+
+def _forget(dups: NearDuplicates, canonical: Dict[int, Any]) -> None:
+    # let go of the reusable parts of the canonical copies that fell out of the near-duplicate window
+    for old in dups.dropped: canonical.pop(old, None)
+    dups.dropped.clear()
+
+def decoder_id(db, fuzzy: bool) -> str:
+    # everything besides the article a decode depends on; a cached decode is only reused by the same decoder
+    tag = [db.source_size, db.source_mtime_ns, db.calculators, CALCULATORS, NLP_MODEL, NLP_MODE,
+           [FUZZY_SCORER, FUZZY_SCORE_CUTOFF, FUZZY_LIMIT] if fuzzy else None]
+    return hashlib.sha1(json.dumps(tag).encode("utf-8")).hexdigest()
+
+class Pipeline:
+    # fetch -> parse -> 5W/phrases -> gematria -> match -> numerology -> patterns -> astrology,
+    # shared by src.main and app.py; every stage records wall/CPU time, items and failures. A stage's wall time is
+    # the time it was busy (summed over pool workers), so stages can overlap; the total is the real elapsed time
+    def __init__(self, db_path: str, archetypes_path: str, workers: int = FETCH_WORKERS, cache=None,
+                 nlp_procs: int = NLP_PROCESSES, rss_feeds: Optional[List[str]] = None,
+                 procs: int = DECODE_PROCESSES, queue_size: int = DECODE_QUEUE_SIZE, fuzzy: bool = FUZZY_MATCHING,
+                 near_dups: bool = NEAR_DUPLICATES, chunk: int = DECODE_CHUNK, per_host: int = FETCH_PER_HOST,
+                 feed_state: Optional[str] = FEED_STATE_PATH, deadline: float = FETCH_DEADLINE_SECONDS):
+        self.reset_stats()
+        self.db_path, self.archetypes_path = db_path, archetypes_path
+        self.workers, self.cache, self.nlp_procs, self.rss_feeds = workers, cache, nlp_procs, rss_feeds
+        self.per_host, self.feed_state = per_host, feed_state  # feed_state: where feed validators persist (None: nowhere)
+        self.deadline = deadline  # seconds a run may spend waiting on article downloads, over all its chunks
+        # procs > 1 overlaps fetching with decoding in a process pool; <= 0 means one process per core
+        self.procs = procs if procs > 0 else (os.cpu_count() or 1)
+        self.queue_size, self.chunk = queue_size, max(1, chunk)
+        if self.procs <= 1: warm_up()  # the model loads while feeds and articles download
+        with self.stage("setup") as st:
+            self.db = load_phrase_db(db_path)
+            self.arch = compile_archetypes(load_archetypes(archetypes_path))
+            self.fuzzy = FuzzyIndex(self.db.names) if fuzzy and self.procs <= 1 else None
+            st["items"] += 1
+        self.fuzzy_enabled, self.near_dups = fuzzy, near_dups
+        self.decoder = decoder_id(self.db, fuzzy)
+
+    def reset_stats(self) -> None:
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._t0 = time.perf_counter()
+
+    def _stat(self, name: str) -> Dict[str, float]:
+        return self.stats.setdefault(name, {"wall": 0.0, "cpu": 0.0, "items": 0, "failures": 0})
+
+    @contextmanager
+    def stage(self, name: str):
+        # an exception escaping the stage counts as one of its failures. CPU is the running thread's own, so
+        # the fetch thread and model loading don't land on whatever stage the main thread is in; decode
+        # workers add theirs through merge_stats, spaCy's n_process children aren't counted
+        st = self._stat(name)
+        w0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            yield st
+        except Exception:
+            st["failures"] += 1; raise
+        finally:
+            st["wall"] += time.perf_counter() - w0
+            st["cpu"] += time.thread_time() - c0
+
+    def timings(self) -> Dict[str, Any]:
+        stages = {k: {"wall_s": round(v["wall"], 4), "cpu_s": round(v["cpu"], 4),
+                      "items": int(v["items"]), "failures": int(v["failures"])}
+                  for k, v in sorted(self.stats.items(), key=lambda kv: STAGES.index(kv[0]) if kv[0] in STAGES else len(STAGES))}
+        slowest = max(stages, key=lambda k: stages[k]["wall_s"]) if stages else None
+        return {"stages": stages, "total_wall_s": round(time.perf_counter() - self._t0, 4), "bottleneck": slowest}
+
+    def feeds(self, days: int = DEFAULT_LOOKBACK_DAYS) -> List[Dict[str, Any]]:
+        with self.stage("feeds") as st:
+            entries = fetch_feed_entries(lookback_days=days, rss_feeds=self.rss_feeds, state_path=self.feed_state)
+            st["items"] += len(entries)
+        return entries
+
+    def merge_stats(self, stats: Dict[str, Dict[str, float]]) -> None:
+        for name, st in stats.items():
+            mine = self._stat(name)
+            for k, v in st.items(): mine[k] += v
+
+    def failed(self, e: Dict[str, Any], err) -> None:
+        # an article that fails to decode is logged and skipped, in both paths; the stage it failed in counts it
+        if isinstance(err, BaseException): err = f"{type(err).__name__}: {err}"
+        log.warning("decode failed for %s: %s", e["link"], err)
+
+    def cached_decode(self, title: str, text: str, published: Optional[str]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        # (content hash, the cached decode of an identical article or None); no hash without a cache
+        if self.cache is None: return None, None
+        key = content_hash({"title": title, "text": text, "published": published})
+        with self.stage("reuse") as st:
+            parts = self.cache.decoded(key, self.decoder); st["items"] += parts is not None
+        return key, parts
+
+    def remember(self, key: Optional[str], item: Dict[str, Any]) -> None:
+        if key is not None and "duplicate_of" not in item:
+            self.cache.put_decoded(key, self.decoder, {k: v for k, v in _reusable(item).items() if k != "link"})
+
+    def run(self, entries: List[Dict[str, Any]], keep_text: int = 0) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        # yields (feed entry, result) in entry order; entries whose article can't be fetched or decoded are skipped
+        self._fetch_left = self.deadline  # one download deadline for the run, shared by its chunks
+        if self.procs > 1:
+            yield from self._run_overlapped(entries, keep_text); return
+        # a story carried by several feeds goes through NLP, gematria and matching once; its other copies
+        # reuse that and keep their own title, source, link, date and patterns
+        dups = NearDuplicates() if self.near_dups else None
+        canonical: Dict[int, Dict[str, Any]] = {}
+        # entries are fetched and decoded a chunk at a time, so only one chunk's articles are held at once
+        for lo in range(0, len(entries), self.chunk):
+            yield from self._run_chunk(entries[lo:lo + self.chunk], lo, dups, canonical, keep_text)
+        if self.cache is not None: self.cache.flush()
+
+    def _run_chunk(self, entries: List[Dict[str, Any]], lo: int, dups: Optional[NearDuplicates],
+                   canonical: Dict[int, Dict[str, Any]], keep_text: int) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        with self.stage("fetch") as st:
+            t = time.perf_counter()
+            fetched = fetch_many([e["link"] for e in entries], workers=self.workers, per_host=self.per_host,
+                                 deadline=max(0.0, self._fetch_left), cache=self.cache)
+            self._fetch_left -= time.perf_counter() - t
+            st["items"] += len(entries); st["failures"] += sum(1 for p in fetched if p is None)
+        # an article whose title, text and date are unchanged since an earlier run reuses that run's decode
+        articles = []
+        for k, (e, parsed) in enumerate(zip(entries, fetched), lo):
+            if parsed is None: continue
+            title, text, published = article_fields(e, parsed)
+            canon, key, reuse = None, None, None
+            if dups is not None:
+                with self.stage("dedup") as st:
+                    canon = dups.check(k, title, text); st["items"] += 1
+            if canon is None: key, reuse = self.cached_decode(title, text, published)
+            articles.append((k, e, parsed, title, text, published, canon, key, reuse))
+        del fetched
+        nlp_items = [a[3:6] for a in articles if a[6] is None and a[8] is None]
+        analyses = analyze_articles(nlp_items, n_process=self.nlp_procs)
+        for k, e, parsed, title, text, published, canon, key, reuse in articles:
+            try:
+                if canon is not None and canon in canonical:
+                    item = self.decode_duplicate(e, parsed, canonical[canon], keep_text)
+                elif reuse is not None:
+                    item = self.decode(e, parsed, title, text, published, reuse["five_w"], reuse["phrases"], keep_text, reuse)
+                else:
+                    with self.stage("nlp") as st:
+                        if canon is None:
+                            res = next(analyses)
+                            if isinstance(res, Exception): raise res  # spaCy failed on this article
+                            five_w, phrases = res
+                        else: five_w, phrases = analyze_article(title, text, published)  # its canonical copy failed
+                        st["items"] += 1
+                    item = self.decode(e, parsed, title, text, published, five_w, phrases, keep_text)
+                    self.remember(key, item)
+            except Exception as exc:
+                self.failed(e, exc); continue
+            if dups is not None and canon is None: canonical[k] = _reusable(item)
+            yield e, item
+        # only once the chunk is done: a copy checked early in it may be dropped by a later check and still be needed
+        if dups is not None: _forget(dups, canonical)
+
+    def _run_overlapped(self, entries: List[Dict[str, Any]], keep_text: int) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        # a fetch thread fills a bounded queue; the main thread hands parsed articles to a process pool
+        # (NLP + matching) with at most 2 x procs in flight and re-emits results in entry order.
+        # a full queue stalls the fetcher and a full pool stalls the queue; the fetcher also works a chunk of
+        # entries at a time, so an early entry that is slow to download holds back at most one chunk of results.
+        # downloads are checked for near duplicates in entry order, as in the sequential path, so the same copy
+        # is canonical whatever the timing or the number of processes; a duplicate waits for its canonical
+        # copy's result and is finished here instead
+        q: "queue.Queue" = queue.Queue(maxsize=max(1, self.queue_size))
+        urls = [e["link"] for e in entries]
+
+        def produce():
+            # "fetch" and the deadline run while waiting on the downloads, not while blocked on a full queue.
+            # whatever happens, the queue ends with None; an error goes ahead of it, to be raised in the main thread
+            try:
+                for lo in range(0, len(urls), self.chunk):
+                    fetched = iter_fetch(urls[lo:lo + self.chunk], workers=self.workers, per_host=self.per_host,
+                                         deadline=max(0.0, self._fetch_left), cache=self.cache)
+                    while True:
+                        with self.stage("fetch") as st:
+                            t = time.perf_counter()
+                            msg = next(fetched, None)
+                            self._fetch_left -= time.perf_counter() - t
+                            if msg is not None: st["items"] += 1; st["failures"] += msg[1] is None
+                        if msg is None: break
+                        q.put((lo + msg[0], msg[1]))
+            except BaseException as exc:
+                q.put(("error", exc))
+            finally:
+                q.put(None)
+        threading.Thread(target=produce, name="fetch-producer", daemon=True).start()
+
+        fetched: Dict[int, Optional[Dict[str, Any]]] = {}  # downloaded, waiting for every lower entry to be checked
+        ready: Dict[int, Optional[Dict[str, Any]]] = {}
+        pending: Dict[Any, int] = {}
+        keys: Dict[int, Optional[str]] = {}  # content hashes of the articles decoding in the pool
+        done: List[int] = []  # decoded since the last round; near duplicates waiting on them can be finished
+        dups = NearDuplicates() if self.near_dups else None
+        canonical: Dict[int, Optional[Dict[str, Any]]] = {}  # None: the canonical copy failed
+        waiting: Dict[int, List[Tuple[int, Dict[str, Any]]]] = {}
+        nxt, checked, producing, max_inflight = 0, 0, True, 2 * self.procs
+
+        def finish(i: int, fn, *args) -> None:
+            # a result decoded here in the main thread; failures are skipped like the pool's
+            try: ready[i] = fn(*args)
+            except Exception as exc: self.failed(entries[i], exc); ready[i] = None
+
+        ctx = mp.get_context("spawn")  # forking a process that runs fetch/model threads isn't safe
+        with ProcessPoolExecutor(max_workers=self.procs, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(self.db_path, self.archetypes_path, self.fuzzy_enabled)) as pool:
+            while producing or pending or nxt < len(entries):
+                if len(pending) < max_inflight and checked in fetched:
+                    i, parsed = checked, fetched.pop(checked); checked += 1
+                    canon, reuse = None, None
+                    if parsed is not None:
+                        title, text, published = article_fields(entries[i], parsed)
+                        if dups is not None:
+                            with self.stage("dedup") as st:
+                                canon = dups.check(i, title, text); st["items"] += 1
+                            _forget(dups, canonical)
+                        if canon is None:
+                            key, reuse = self.cached_decode(title, text, published)
+                            if reuse is None: keys[i] = key
+                    if parsed is None: ready[i] = None
+                    elif reuse is not None:
+                        finish(i, self.decode, entries[i], parsed, title, text, published, reuse["five_w"], reuse["phrases"],
+                               keep_text, reuse)
+                        done.append(i)
+                    elif canon is None or (canon in canonical and canonical[canon] is None):
+                        pending[pool.submit(_decode_in_worker, entries[i], parsed, keep_text)] = i
+                    elif canon in canonical:
+                        finish(i, self.decode_duplicate, entries[i], parsed, canonical[canon], keep_text)
+                    else:
+                        waiting.setdefault(canon, []).append((i, parsed))
+                elif producing and len(pending) < max_inflight:
+                    try: msg = q.get(timeout=0.05)
+                    except queue.Empty: msg = False
+                    if msg is None: producing = False
+                    elif msg and msg[0] == "error":
+                        for f in pending: f.cancel()
+                        raise msg[1]
+                    elif msg: fetched[msg[0]] = msg[1]
+                elif pending:
+                    wait(list(pending), timeout=0.05, return_when=FIRST_COMPLETED)
+                elif not producing:
+                    break
+                for f in [f for f in pending if f.done()]:
+                    i = pending.pop(f)
+                    try:
+                        item, stats, err = f.result()
+                        self.merge_stats(stats)
+                    except Exception as exc:  # the pool itself failed (a worker died, a result didn't pickle)
+                        item, err = None, exc; self._stat("nlp")["failures"] += 1
+                    if item is None: self.failed(entries[i], err); keys.pop(i, None)
+                    else: self.remember(keys.pop(i, None), item)
+                    ready[i] = item; done.append(i)
+                for i in done:
+                    if dups is not None:
+                        canon = _reusable(ready[i]) if ready[i] is not None else None
+                        if i in dups: canonical[i] = canon  # not if it already fell out of the window
+                        for w, parsed in waiting.pop(i, []):
+                            if canon is None: pending[pool.submit(_decode_in_worker, entries[w], parsed, keep_text)] = w
+                            else: finish(w, self.decode_duplicate, entries[w], parsed, canon, keep_text)
+                done.clear()
+                while nxt in ready:
+                    item = ready.pop(nxt)
+                    if item is not None: yield entries[nxt], item
+                    nxt += 1
+        if self.cache is not None: self.cache.flush()
+
+    def decode_duplicate(self, e, parsed, canonical: Dict[str, Any], keep_text: int = 0) -> Dict[str, Any]:
+        title, text, published = article_fields(e, parsed)
+        return self.decode(e, parsed, title, text, published, canonical["five_w"], canonical["phrases"], keep_text, canonical,
+                           duplicate_of=canonical["link"])
+
+    def decode(self, e, parsed, title, text, published, five_w, phrases, keep_text: int = 0,
+               reuse: Optional[Dict[str, Any]] = None, duplicate_of: Optional[str] = None) -> Dict[str, Any]:
+        # with `reuse` (a near duplicate's first copy, or a cached decode of the same content) the gematria
+        # values and matches are taken from it
+        if reuse is not None:
+            values_map, matches, fuzzy = reuse["values"], reuse["matches"], reuse.get("fuzzy_matches")
+        else:
+            with self.stage("gematria") as st:
+                values_map = compute_values(phrases, CALCULATORS, CALC_FUNCS); st["items"] += len(phrases)
+            with self.stage("match") as st:
+                matches = find_matches(values_map, self.db); st["items"] += 1
+            fuzzy = None
+            if self.fuzzy is not None:
+                with self.stage("fuzzy") as st:
+                    fuzzy = self.fuzzy.match(phrases); st["items"] += len(phrases)
+        dt = article_date(published)
+        with self.stage("numerology") as st:
+            dnum = calendar().numerology(dt); st["items"] += 1
+        with self.stage("patterns") as st:
+            arch_scan = self.arch.scan(title + "\n" + text[:5000])
+            arch_hits = list(arch_scan)[:20]
+            pat = score_ritual_signature(title, text, num_matches=len(matches), date_info=dnum)
+            pat["archetype_hits"] = arch_hits
+            pat["archetype_counts"] = {w: len(arch_scan[w]) for w in arch_hits}
+            st["items"] += 1
+        with self.stage("astrology") as st:
+            astro = calendar().astrology(dt); st["items"] += 1
+        item = {
+            "title": title, "link": e["link"], "source": e.get("source"),
+            "published": published, "authors": parsed.get("authors"),
+            "five_w": five_w, "phrases": phrases, "values": values_map,
+            "matches": matches, "numerology": dnum, "patterns": pat, "astrology": astro
+        }
+        if fuzzy is not None: item["fuzzy_matches"] = fuzzy
+        if duplicate_of is not None: item["duplicate_of"] = duplicate_of
+        if keep_text: item["text"] = text[:keep_text]
+        return item
+
+_WORKER: Optional[Pipeline] = None
+
+def _init_worker(db_path: str, archetypes_path: str, fuzzy: bool) -> None:
+    global _WORKER
+    _WORKER = Pipeline(db_path, archetypes_path, workers=1, procs=1, fuzzy=fuzzy, near_dups=False)
+
+def _decode_in_worker(e, parsed, keep_text: int):
+    # runs in a pool process; returns (result or None, the stage stats it took, the error if it failed)
+    w = _WORKER; w.stats = {}
+    title, text, published = article_fields(e, parsed)
+    try:
+        with w.stage("nlp") as st:
+            five_w, phrases = analyze_article(title, text, published); st["items"] += 1
+        return w.decode(e, parsed, title, text, published, five_w, phrases, keep_text), w.stats, None
+    except Exception as exc:
+        return None, w.stats, f"{type(exc).__name__}: {exc}"
+
+@contextmanager
+def profiled(kind: Optional[str], outdir: str):
+    # opt-in profiler around a run: 'cprofile' writes profile-<ts>.prof, 'pyinstrument' profile-<ts>.html
+    if not kind:
+        yield; return
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    if kind == "cprofile":
+        import cProfile
+        prof = cProfile.Profile(); prof.enable()
+        try: yield
+        finally:
+            prof.disable(); prof.dump_stats(str(Path(outdir) / f"profile-{stamp}.prof"))
+    elif kind == "pyinstrument":
+        from pyinstrument import Profiler
+        prof = Profiler(); prof.start()
+        try: yield
+        finally:
+            prof.stop(); (Path(outdir) / f"profile-{stamp}.html").write_text(prof.output_html())
+    else:
+        raise ValueError(f"unknown profiler: {kind}")
@@ -0,0 +1,119 @@
+import json
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, List
+
+MD_HEADER = "# Daily Decode Report\n"
+
+def _stamp() -> str: return datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+
+def markdown_item(it: Dict[str, Any]) -> List[str]:
+    parts = []
+    parts.append(f"## {it['title']}")
+    parts.append(f"Source: {it.get('source')} — Published: {it.get('published')}\nLink: {it.get('link')}\n")
+    if it.get("duplicate_of"):
+        # a near duplicate shares its 5W and matches with its canonical copy, which is listed in full
+        parts.append(f"Same story as {it['duplicate_of']} (5W and matches as listed there)\n\n---\n")
+        return parts
+    fw = it["five_w"]
+    parts.append("**5W Summary**:")
+    parts.append(f"- Who: {', '.join(fw.get('who', []))}")
+    parts.append(f"- What: {', '.join(fw.get('what', []))}")
+    parts.append(f"- When: {', '.join(fw.get('when_parsed', []) or fw.get('when_mentions', []))}")
+    parts.append(f"- Where: {', '.join(fw.get('where', []))}")
+    parts.append(f"- Why: {fw.get('why') or '—'}\n")
+    parts.append("**Gematria Matches (top 10)**:")
+    if it["matches"]:
+        for m in it["matches"][:10]:
+            parts.append(f"- '{m['phrase']}' ↔ '{m['db_phrase']}' via {m['calculator']} = **{m['value']}**")
+    else:
+        parts.append("- (no exact numeric matches)")
+    if it.get("fuzzy_matches"):
+        parts.append("\n**Fuzzy phrase matches**:")
+        for m in it["fuzzy_matches"][:10]:
+            parts.append(f"- '{m['phrase']}' ~ '{m['db_phrase']}' ({m['score']})")
+    pat = it["patterns"]
+    parts.append("\n**Patterns**:")
+    parts.append(f"- Score: {pat['score']} | Headline nums: {pat['headline_symbolic_numbers']} | Life path: {pat['life_path']} | Master day: {pat['master_day']}")
+    if it.get("astrology"):
+        parts.append(f"- Astrology (approx): Sun sign on date: {it['astrology'].get('sun_sign')}")
+    parts.append("\n---\n")
+    return parts
+
+def markdown_timings(timings: Dict[str, Any]) -> List[str]:
+    parts = ["## Run timings\n", f"Total {timings['total_wall_s']}s — bottleneck: **{timings['bottleneck']}**\n",
+             "| Stage | Wall (s) | CPU (s) | Items | Failures |", "|---|---:|---:|---:|---:|"]
+    for name, st in timings["stages"].items():
+        parts.append(f"| {name} | {st['wall_s']} | {st['cpu_s']} | {st['items']} | {st['failures']} |")
+    return parts
+
+def markdown_analytics(summary: Dict[str, Any]) -> List[str]:
+    # analytics.summarize() output: what was frequent, what spiked on the latest day, what co-occurred
+    days = summary["days"]
+    parts = ["## Corpus analytics\n",
+             f"{summary['articles']} articles from {summary['sources']} sources" + (f", {days[0]} – {days[-1]}\n" if days else "\n")]
+    for calc, hist in summary["values"].items():
+        if hist: parts.append(f"- **{calc}**: " + ", ".join(f"{lbl.split('=', 1)[1]} ×{n}" for lbl, n in hist))
+    if summary["headline_numbers"]: parts.append("- **Headline numbers**: " + ", ".join(f"{lbl} ×{n}" for lbl, n in summary["headline_numbers"]))
+    if summary["archetypes"]: parts.append("- **Archetypes**: " + ", ".join(f"{lbl[1:]} ×{n}" for lbl, n in summary["archetypes"]))
+    if summary["spikes"]:
+        parts += [f"\n**Spikes on {summary['spikes'][0]['day']}** (vs. the other days' mean)\n",
+                  "| Feature | Count | Baseline | Score |", "|---|---:|---:|---:|"]
+        parts += [f"| {s['feature']} | {s['count']} | {s['baseline']} | {s['score']} |" for s in summary["spikes"]]
+    if summary["pairs"]:
+        parts += ["\n**Co-occurring in the same article**\n", "| A | B | Articles |", "|---|---|---:|"]
+        parts += [f"| {a} | {b} | {n} |" for a, b, n in summary["pairs"]]
+    return parts + [""]
+
+def write_timings(timings: Dict[str, Any], report_path: str) -> str:
+    # sidecar next to a report: report-<ts>.json / .jsonl -> report-<ts>.timings.json
+    p = Path(report_path); p = p.with_name(p.name.split(".")[0] + ".timings.json")
+    p.write_text(json.dumps(timings, indent=2))
+    return str(p)
+
+def write_json(items, outdir: str) -> str:
+    # items can be any iterable (e.g. result_model.expand); they're written one at a time, and the file reads
+    # exactly as json.dumps(list(items), indent=2) would
+    p = Path(outdir) / f"report-{_stamp()}.json"
+    with open(p, "w", encoding="utf-8") as f:
+        n = 0
+        for it in items:
+            f.write(("[\n  " if n == 0 else ",\n  ") + json.dumps(it, ensure_ascii=False, indent=2).replace("\n", "\n  ")); n += 1
+        f.write("\n]" if n else "[]")
+    return str(p)
+
+def write_markdown(items, outdir: str, timings: Dict[str, Any] = None, analytics: Dict[str, Any] = None) -> str:
+    p = Path(outdir) / f"report-{_stamp()}.md"
+    parts = [MD_HEADER]
+    if analytics: parts.extend(markdown_analytics(analytics))
+    for it in items:
+        parts.extend(markdown_item(it))
+    if timings: parts.extend(markdown_timings(timings))
+    p.write_text("\n".join(parts))
+    return str(p)
+
+class StreamingReport:
+    # one compact JSON line per article (NDJSON) plus the Markdown report, flushed as each article lands
+    def __init__(self, outdir: str):
+        stamp = _stamp()
+        self.jsonl_path = str(Path(outdir) / f"report-{stamp}.jsonl")
+        self.md_path = str(Path(outdir) / f"report-{stamp}.md")
+        self._jf = open(self.jsonl_path, "w", encoding="utf-8")
+        self._mf = open(self.md_path, "w", encoding="utf-8")
+        self._mf.write(MD_HEADER); self._mf.flush()
+        self.count = 0
+
+    def add(self, item: Dict[str, Any]) -> None:
+        self._jf.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n"); self._jf.flush()
+        self._mf.write("\n" + "\n".join(markdown_item(item))); self._mf.flush()
+        self.count += 1
+
+    def close(self, timings: Dict[str, Any] = None, analytics: Dict[str, Any] = None) -> None:
+        # streamed reports can't lead with the analytics, so they come after the articles
+        if analytics: self._mf.write("\n" + "\n".join(markdown_analytics(analytics)) + "\n")
+        if timings: self._mf.write("\n" + "\n".join(markdown_timings(timings)) + "\n")
+        self._jf.close(); self._mf.close()
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): self.close()
@@ -0,0 +1,75 @@
+import bisect, re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+from .result_model import CompactResult
+
+_WORD = re.compile(r"\w+")
+
+def search_text(item: CompactResult) -> str:
+    # what the search box looks at: title, source and the 5W fields, lowercased
+    fw = item.get('five_w') or {}
+    return " ".join([
+        item.get('title') or '', item.get('source') or '',
+        *(fw.get('who') or []), *(fw.get('what') or []), *(fw.get('where') or []),
+        fw.get('why') or ''
+    ]).lower()
+
+class ResultIndex:
+    # built once per decode; filters are answered from postings instead of rescanning every item.
+    # search keeps substring semantics: the query's words narrow the candidates through the token
+    # vocabulary (inner words must be whole tokens, edge words may be part of one) and the cached
+    # haystacks confirm the hit
+    def __init__(self, items: List[CompactResult]):
+        self.items = items
+        self._hay = [search_text(it) for it in items]
+        self._tokens: Dict[str, Set[int]] = defaultdict(set)
+        self._values: Dict[str, Set[int]] = defaultdict(set)
+        for i, hay in enumerate(self._hay):
+            for tok in _WORD.findall(hay): self._tokens[tok].add(i)
+        for i, it in enumerate(items):
+            for v in it.match_values(): self._values[str(v)].add(i)
+        self._with_matches = {i for i, it in enumerate(items) if it.has_matches}
+        by_score = sorted((it['patterns']['score'], i) for i, it in enumerate(items))
+        self._scores = [s for s, _ in by_score]
+        self._by_score = [i for _, i in by_score]
+        self._partial = lru_cache(maxsize=256)(self._containing)
+
+    def __len__(self) -> int: return len(self.items)
+
+    @property
+    def with_matches(self) -> int: return len(self._with_matches)
+
+    @property
+    def avg_score(self) -> float:
+        return round(sum(self._scores) / len(self._scores), 2) if self._scores else 0
+
+    def _containing(self, word: str) -> frozenset:
+        out: Set[int] = set()
+        for tok, ids in self._tokens.items():
+            if word in tok: out |= ids
+        return frozenset(out)
+
+    def search(self, query: str) -> Set[int]:
+        q = query.lower()
+        words = _WORD.findall(q)
+        if not words: return {i for i, hay in enumerate(self._hay) if q in hay}
+        cand: Optional[Set[int]] = None
+        for k, w in enumerate(words):
+            ids = self._tokens.get(w, set()) if 0 < k < len(words) - 1 else self._partial(w)
+            cand = set(ids) if cand is None else cand & ids
+            if not cand: return set()
+        return {i for i in cand if q in self._hay[i]}
+
+    def filter(self, query: str = "", only_matches: bool = False, number: str = "", min_score: int = 0) -> List[CompactResult]:
+        # same result, in the same order, as checking every item against the app's filters
+        ids: Optional[Set[int]] = None
+        def narrow(s: Set[int]):
+            nonlocal ids
+            ids = set(s) if ids is None else ids & s
+        if min_score: narrow(set(self._by_score[bisect.bisect_left(self._scores, min_score):]))
+        if only_matches: narrow(self._with_matches)
+        if number: narrow(self._values.get(str(number), set()))
+        if query: narrow(self.search(query))
+        if ids is None: return list(self.items)
+        return [self.items[i] for i in sorted(ids)]
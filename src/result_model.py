@@ -0,0 +1,212 @@
+import sys, threading, zlib
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from .config import RESULT_STRINGS_MAX, RESULT_LAYOUTS_MAX
+
+class Strings:
+    # string table: every phrase, DB phrase and calculator name is stored once and results refer to it by id.
+    # Lookups are lock-free; only adding a new string takes the lock
+    def __init__(self):
+        self.strings: List[str] = []; self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def id(self, s: str) -> int:
+        i = self._ids.get(s)
+        if i is None:
+            with self._lock:
+                i = self._ids.get(s)
+                if i is None:
+                    i = len(self.strings); self.strings.append(s); self._ids[s] = i
+        return i
+
+    def __getitem__(self, i: int) -> str: return self.strings[i]
+
+    def __len__(self) -> int: return len(self.strings)
+
+_STRINGS = Strings()
+_STRINGS_LOCK = threading.Lock()
+
+def string_table() -> Strings:
+    # the table new results intern into. Once it holds RESULT_STRINGS_MAX strings a fresh one takes over; every
+    # result keeps a reference to its own table, so an old table lives exactly as long as its results do
+    global _STRINGS
+    table = _STRINGS
+    if len(table) >= RESULT_STRINGS_MAX:
+        with _STRINGS_LOCK:
+            if _STRINGS is table: _STRINGS = Strings()
+            table = _STRINGS
+    return table
+
+_LAYOUTS: Dict[Tuple, Tuple] = {}
+def _layout(keys: Tuple) -> Tuple:
+    # one shared tuple per distinct key order, so thousands of results with the same shape share their keys.
+    # the table is capped: past RESULT_LAYOUTS_MAX shapes, a new one just keeps its own tuple
+    hit = _LAYOUTS.get(keys)
+    if hit is not None: return hit
+    if len(_LAYOUTS) < RESULT_LAYOUTS_MAX: return _LAYOUTS.setdefault(keys, keys)
+    return keys
+
+@dataclass(slots=True)
+class _Frozen:
+    # a dict as (shared key layout, values)
+    keys: Tuple
+    vals: Tuple
+
+# dicts keyed by data rather than by a schema (archetype word -> count, phrase -> values): every one has its
+# own keys, so they keep them instead of adding a layout per article
+_DATA_KEYED = frozenset({"archetype_counts", "values"})
+
+def _freeze(x, shared: bool = True):
+    # JSON-shaped value -> tuples/_Frozen with short strings interned; _thaw reverses it exactly
+    if isinstance(x, dict):
+        keys = tuple(x)
+        return _Frozen(_layout(keys) if shared else keys, tuple(_freeze(v, k not in _DATA_KEYED) for k, v in x.items()))
+    if isinstance(x, list): return tuple(_freeze(v) for v in x)
+    if isinstance(x, str) and len(x) <= 64: return sys.intern(x)
+    return x
+
+def _thaw(x):
+    if isinstance(x, _Frozen): return {k: _thaw(v) for k, v in zip(x.keys, x.vals)}
+    if isinstance(x, tuple): return [_thaw(v) for v in x]
+    return x
+
+_MATCH_KEYS = ("phrase", "db_phrase", "calculator", "value")
+_COLUMNS = ("phrases", "values", "matches", "text")
+
+def _phrase_ids(phrases, strings: Strings) -> Optional[array]:
+    if not isinstance(phrases, list) or not all(isinstance(p, str) for p in phrases): return None
+    return array('i', [strings.id(p) for p in phrases])
+
+def _value_table(values, strings: Strings) -> Optional[Tuple[Tuple[int, ...], array, array]]:
+    # {phrase: {calculator: value}} -> (calculator ids, phrase ids, row-major values) when every phrase has
+    # the same calculators; anything irregular stays generic
+    if not isinstance(values, dict): return None
+    calcs = None
+    for vals in values.values():
+        if not isinstance(vals, dict) or (calcs is not None and tuple(vals) != calcs): return None
+        calcs = tuple(vals)
+    try:
+        table = array('i', [v for vals in values.values() for v in vals.values()])
+    except (TypeError, OverflowError):
+        return None
+    return _layout(tuple(strings.id(c) for c in calcs or ())), array('i', [strings.id(p) for p in values]), table
+
+def _match_table(matches, strings: Strings) -> Optional[array]:
+    # [{'phrase', 'db_phrase', 'calculator', 'value'}] -> flat (phrase id, DB phrase id, calculator id, value) rows
+    if not isinstance(matches, list): return None
+    out = array('i')
+    try:
+        for m in matches:
+            if not isinstance(m, dict) or tuple(m) != _MATCH_KEYS: return None
+            out.extend((strings.id(m['phrase']), strings.id(m['db_phrase']), strings.id(m['calculator']), m['value']))
+    except (TypeError, OverflowError):
+        return None
+    return out
+
+@dataclass(slots=True)
+class CompactResult:
+    # one decoded article as the pipeline's result dict, minus the per-result overhead: phrases, gematria values
+    # and matches are arrays of string-table ids, the small nested fields are tuples with shared key layouts and
+    # the text preview is compressed. to_dict() gives back the exact dict (same keys, same order)
+    strings: Strings  # the table its ids refer to
+    layout: Tuple
+    title: Optional[str]
+    link: Optional[str]
+    phrases: Optional[array]
+    calcs: Tuple[int, ...]
+    value_phrases: Optional[array]  # None: the same ids as `phrases`
+    values: Optional[array]
+    matches: Optional[array]
+    text: Optional[bytes]
+    rest: _Frozen  # every other field
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> "CompactResult":
+        strings = string_table()
+        phrases = _phrase_ids(item.get("phrases"), strings) if "phrases" in item else None
+        table = _value_table(item["values"], strings) if "values" in item else None
+        matches = _match_table(item["matches"], strings) if "matches" in item else None
+        text = item.get("text")
+        text = zlib.compress(text.encode("utf-8")) if isinstance(text, str) else None
+        calcs, value_phrases, values = table or ((), None, None)
+        if value_phrases is not None and phrases is not None and value_phrases == phrases: value_phrases = phrases
+        done = {"phrases": phrases, "values": values, "matches": matches, "text": text}
+        other = {k: v for k, v in item.items() if k not in ("title", "link") and done.get(k) is None}
+        return cls(strings, _layout(tuple(item)), item.get("title"), item.get("link"), phrases, calcs,
+                   None if value_phrases is phrases else value_phrases, values, matches, text, _freeze(other))
+
+    def _value_dict(self) -> Dict[str, Dict[str, int]]:
+        calcs = [self.strings[c] for c in self.calcs]
+        rows = self.phrases if self.value_phrases is None else self.value_phrases
+        n, vals = len(calcs), self.values
+        return {self.strings[p]: dict(zip(calcs, vals[k * n:(k + 1) * n])) for k, p in enumerate(rows)}
+
+    def _match_list(self) -> List[Dict[str, Any]]:
+        m, s = self.matches, self.strings.strings
+        return [{"phrase": s[m[k]], "db_phrase": s[m[k + 1]], "calculator": s[m[k + 2]], "value": m[k + 3]}
+                for k in range(0, len(m), 4)]
+
+    def get(self, key: str, default=None):
+        # one field in its dict form, without rebuilding the rest
+        if key not in self.layout: return default
+        if key == "title": return self.title
+        if key == "link": return self.link
+        if key == "phrases" and self.phrases is not None: return [self.strings[p] for p in self.phrases]
+        if key == "values" and self.values is not None: return self._value_dict()
+        if key == "matches" and self.matches is not None: return self._match_list()
+        if key == "text" and self.text is not None: return zlib.decompress(self.text).decode("utf-8")
+        i = self.rest.keys.index(key)
+        return _thaw(self.rest.vals[i])
+
+    def __getitem__(self, key: str):
+        if key not in self.layout: raise KeyError(key)
+        return self.get(key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        rest = dict(zip(self.rest.keys, self.rest.vals))
+        out = {}
+        for k in self.layout:
+            out[k] = _thaw(rest[k]) if k in rest else self.get(k)
+        return out
+
+    # cheap views for filtering and indexing
+    @property
+    def has_matches(self) -> bool:
+        return bool(self.matches) if self.matches is not None else bool(self.get("matches"))
+
+    def match_values(self) -> Set[int]:
+        if self.matches is None: return {m["value"] for m in self.get("matches") or []}
+        return set(self.matches[3::4])
+
+    def __getstate__(self):
+        # string-table ids are only meaningful in this process, so a pickle carries its own small table
+        local: Dict[int, int] = {}
+        remap = lambda ids: array('i', [local.setdefault(i, len(local)) for i in ids]) if ids is not None else None
+        matches = None
+        if self.matches is not None:
+            matches = array('i', self.matches)
+            for k in range(0, len(matches), 4):
+                matches[k], matches[k + 1], matches[k + 2] = (local.setdefault(matches[k + j], len(local)) for j in range(3))
+        state = (self.layout, self.title, self.link, remap(self.phrases), tuple(remap(self.calcs)), remap(self.value_phrases),
+                 self.values, matches, self.text, self.rest)
+        return [self.strings[i] for i in local], state
+
+    def __setstate__(self, st):
+        strings, (layout, title, link, phrases, calcs, value_phrases, values, matches, text, rest) = st
+        self.strings = string_table()
+        ids = [self.strings.id(s) for s in strings]
+        back = lambda a: array('i', [ids[i] for i in a]) if a is not None else None
+        if matches is not None:
+            for k in range(0, len(matches), 4):
+                matches[k], matches[k + 1], matches[k + 2] = ids[matches[k]], ids[matches[k + 1]], ids[matches[k + 2]]
+        self.layout, self.title, self.link = _layout(layout), title, link
+        self.phrases, self.calcs, self.value_phrases = back(phrases), _layout(tuple(back(calcs))), back(value_phrases)
+        self.values, self.matches, self.text, self.rest = values, matches, text, rest
+
+def compact(items: Iterable[Dict[str, Any]]) -> List[CompactResult]:
+    return [CompactResult.from_dict(it) for it in items]
+
+def expand(results: Iterable[CompactResult]) -> Iterable[Dict[str, Any]]:
+    # the output boundary: result dicts one at a time, for writers that stream
+    return (r.to_dict() for r in results)
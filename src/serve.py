@@ -0,0 +1,246 @@
+import argparse, json, random, sys, threading, time, traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from .config import (RSS_FEEDS, DEFAULT_LOOKBACK_DAYS, FEED_WORKERS, FEED_STATE_PATH, ARTICLE_CACHE_PATH, LEDGER_PATH,
+                     ARCHIVE_PATH, FUZZY_MATCHING, NEAR_DUPLICATES, SERVE_HOST, SERVE_PORT, SERVE_MAX_RESULTS,
+                     FEED_POLL_MIN_SECONDS, FEED_POLL_MAX_SECONDS, FEED_POLL_BACKOFF, ARTICLE_RETRY_SECONDS, ARTICLE_RETRY_MAX_SECONDS)
+from .archive import Archive
+from .cache import ArticleCache
+from .dates import parse_published
+from .ingest import poll_feed, feed_items, load_feed_state, save_feed_state
+from .ledger import Ledger, entry_fingerprint
+from .pipeline import Pipeline
+from .result_model import CompactResult
+
+class FeedSchedule:
+    # when to poll one feed next: new entries bring the interval down toward min_interval, a quiet poll
+    # stretches it by `backoff` and a failed one by backoff^2, up to max_interval. A little jitter keeps
+    # feeds that started together from staying in lockstep
+    def __init__(self, url: str, min_interval: float = FEED_POLL_MIN_SECONDS, max_interval: float = FEED_POLL_MAX_SECONDS,
+                 backoff: float = FEED_POLL_BACKOFF):
+        self.url, self.min, self.max, self.backoff = url, min_interval, max_interval, backoff
+        self.interval, self.due = min_interval, 0.0
+        self.failures, self.last_poll, self.last_new = 0, None, 0
+
+    def polled(self, now: float, new: Optional[int]) -> None:
+        # new: how many entries the poll turned up, None if the feed couldn't be read
+        if new is None:
+            self.failures += 1; self.interval = min(self.max, self.interval * self.backoff ** 2)
+        else:
+            self.failures, self.last_new = 0, new
+            self.interval = max(self.min, self.interval / self.backoff) if new else min(self.max, self.interval * self.backoff)
+        self.last_poll, self.due = now, now + self.interval * random.uniform(0.9, 1.1)
+
+    def status(self, now: float) -> Dict[str, Any]:
+        return {"url": self.url, "interval_s": round(self.interval), "next_poll_in_s": max(0, round(self.due - now)),
+                "failures": self.failures, "last_new": self.last_new,
+                "last_poll": datetime.fromtimestamp(self.last_poll, timezone.utc).isoformat() if self.last_poll else None}
+
+class DecodeService:
+    # the pipeline kept warm between polls (spaCy model, phrase DB, archetypes, fuzzy index, calendar), a
+    # schedule per feed, and the decoded results of the lookback window, newest last. Entries the ledger
+    # already has unchanged are taken from it, so a restart doesn't decode everything again
+    def __init__(self, feeds: List[str], days: int = DEFAULT_LOOKBACK_DAYS, db_path: str = "database/phrases.json",
+                 archetypes_path: str = "database/archetypes.json", cache_path: str = ARTICLE_CACHE_PATH,
+                 ledger_path: str = LEDGER_PATH, archive_path: str = ARCHIVE_PATH, state_path: Optional[str] = FEED_STATE_PATH,
+                 fuzzy: bool = FUZZY_MATCHING, near_dups: bool = NEAR_DUPLICATES, max_results: int = SERVE_MAX_RESULTS):
+        self.pipe = Pipeline(db_path, archetypes_path, cache=ArticleCache(cache_path) if cache_path else None,
+                             rss_feeds=feeds, procs=1, fuzzy=fuzzy, near_dups=near_dups)
+        self.ledger = Ledger(ledger_path) if ledger_path else None
+        self.archive = Archive(archive_path) if archive_path else None
+        self.days, self.state_path, self.max_results = days, state_path, max_results
+        self.feeds = [FeedSchedule(u) for u in feeds]
+        self.state = load_feed_state(state_path)
+        # link -> (entry fingerprint, entry publish time, result)
+        self.results: "OrderedDict[str, Tuple[str, Optional[datetime], CompactResult]]" = OrderedDict()
+        # link -> (entry fingerprint, retry after, failures): a failed link is retried once the entry changes or,
+        # since most failures are passing (a timeout, a 5xx), after a delay that doubles with every failure
+        self.failed: Dict[str, Tuple[str, float, int]] = {}
+        self.owner: Dict[str, str] = {}  # link -> the feed it was first decoded from; other feeds carrying it don't re-decode it
+        self.lock = threading.Lock()
+        self.version, self.decoded, self.started, self.last_batch = 0, 0, time.time(), None
+        self.poll_errors, self.error_streak, self.last_error = 0, 0, None
+        self._payloads: Dict[Any, bytes] = {}
+
+    def _is_new(self, e: Dict[str, Any], url: str) -> bool:
+        if self.owner.get(e["link"], url) != url: return False
+        fp = entry_fingerprint(e)
+        hit, failed = self.results.get(e["link"]), self.failed.get(e["link"])
+        return (hit is None or hit[0] != fp) and (failed is None or failed[0] != fp or time.time() >= failed[1])
+
+    def poll(self, pool: ThreadPoolExecutor) -> int:
+        # polls the feeds that are due and decodes what's new; returns the number of new entries
+        now = time.time()
+        due = [s for s in self.feeds if s.due <= now]
+        if not due: return 0
+        self.pipe.reset_stats()  # timings per batch
+        with self.pipe.stage("feeds") as st:
+            polled = list(pool.map(lambda s: poll_feed(s.url, self.state.get(s.url)), due))
+            st["items"] += len(due); st["failures"] += sum(1 for f in polled if f is None)
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.days)
+        taken, fresh = set(), []
+        for s, feed in zip(due, polled):
+            if feed is None:
+                s.polled(now, None); continue
+            self.state[s.url] = feed
+            new = [e for e in feed_items(feed, cutoff, taken) if self._is_new(e, s.url)]
+            for e in new: self.owner[e["link"]] = s.url
+            s.polled(now, len(new)); fresh += new
+        save_feed_state(self.state, self.state_path)
+        self._prune(cutoff)
+        if fresh: self.decode(fresh)
+        return len(fresh)
+
+    def decode(self, entries: List[Dict[str, Any]]) -> None:
+        todo = [e for e in entries if not (self.ledger is not None and self.ledger.is_current(e))]
+        todo_links = {e["link"] for e in todo}
+        for e in entries:
+            if e["link"] not in todo_links and (r := self.ledger.result(e["link"])) is not None:
+                self._store(e, r)
+        done = set()
+        for e, item in self.pipe.run(todo):
+            with self.pipe.stage("write") as st:
+                if self.ledger is not None: self.ledger.record(e, item)
+                if self.archive is not None: self.archive.add(item)
+                self._store(e, item); done.add(e["link"]); st["items"] += 1
+        if self.archive is not None: self.archive.commit()
+        now = time.time()
+        for e in todo:
+            prev = self.failed.pop(e["link"], None)
+            if e["link"] in done: continue
+            fp = entry_fingerprint(e)
+            n = prev[2] + 1 if prev is not None and prev[0] == fp else 1
+            self.failed[e["link"]] = (fp, now + min(ARTICLE_RETRY_MAX_SECONDS, ARTICLE_RETRY_SECONDS * 2 ** (n - 1)), n)
+        while len(self.failed) > self.max_results: self.failed.pop(next(iter(self.failed)))
+        self.owner = {link: url for link, url in self.owner.items() if link in self.results or link in self.failed}
+        self.decoded += len(done)
+        self.last_batch = {"at": datetime.now(timezone.utc).isoformat(), "entries": len(entries), "decoded": len(done),
+                           "from_ledger": len(entries) - len(todo), "timings": self.pipe.timings()}
+
+    def poll_failed(self, exc: BaseException) -> float:
+        # a poll that raised (a model error, a locked database) is counted and shown in /status; returns how long
+        # to wait before the next one, longer with every failure in a row. Every feed is due by then, so
+        # the entries the failed poll didn't finish are picked up again (mostly from 304s)
+        self.poll_errors += 1; self.error_streak += 1
+        self.last_error = {"at": datetime.now(timezone.utc).isoformat(), "error": f"{type(exc).__name__}: {exc}"}
+        delay = min(FEED_POLL_MAX_SECONDS, FEED_POLL_MIN_SECONDS * FEED_POLL_BACKOFF ** (self.error_streak - 1))
+        for s in self.feeds: s.due = min(s.due, time.time() + delay)
+        return delay
+
+    def _store(self, e: Dict[str, Any], item: Dict[str, Any]) -> None:
+        r = CompactResult.from_dict(item)
+        with self.lock:
+            self.results.pop(e["link"], None)
+            self.results[e["link"]] = (entry_fingerprint(e), parse_published(e["published"]) if e.get("published") else None, r)
+            while len(self.results) > self.max_results: self.results.popitem(last=False)
+            self.version += 1
+
+    def _prune(self, cutoff: datetime) -> None:
+        # results whose entry fell out of the lookback window
+        with self.lock:
+            old = [link for link, (_, published, _) in self.results.items() if published and published < cutoff]
+            for link in old: del self.results[link]
+            if old: self.version += 1
+
+    def latest(self, limit: int) -> bytes:
+        # newest first, as the JSON body of /results; encoded once per version and limit
+        with self.lock:
+            key = (self.version, limit)
+            body = self._payloads.get(key)
+            if body is not None: return body
+            picked = [r for _, _, r in reversed(self.results.values())][:limit]
+            version = self.version
+        body = json.dumps({"version": version, "count": len(picked), "results": [r.to_dict() for r in picked]},
+                          ensure_ascii=False).encode("utf-8")
+        with self.lock:
+            self._payloads = {k: v for k, v in self._payloads.items() if k[0] == self.version}
+            self._payloads[key] = body
+        return body
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        return {"version": self.version, "results": len(self.results), "decoded": self.decoded, "failed": len(self.failed),
+                "uptime_s": round(now - self.started), "feeds": [s.status(now) for s in self.feeds],
+                "last_batch": self.last_batch, "poll_errors": self.poll_errors, "last_error": self.last_error}
+
+    def next_due(self) -> float:
+        return min((s.due for s in self.feeds), default=time.time() + FEED_POLL_MAX_SECONDS)
+
+    def close(self) -> None:
+        if self.ledger is not None: self.ledger.close()
+        if self.archive is not None: self.archive.close()
+
+def make_handler(service: DecodeService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, body: bytes) -> None:
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers(); self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            qs = parse_qs(url.query)
+            if url.path == "/results":
+                try: limit = int(qs.get("limit", [service.max_results])[0])
+                except ValueError: return self._send(400, b'{"error": "limit must be an integer"}')
+                self._send(200, service.latest(max(0, limit)))
+            elif url.path == "/status":
+                self._send(200, json.dumps(service.status()).encode("utf-8"))
+            elif url.path == "/health":
+                self._send(200, b'{"ok": true}')
+            else:
+                self._send(404, b'{"error": "not found"}')
+
+        def log_message(self, *args): pass
+    return Handler
+
+def serve(service: DecodeService, host: str = SERVE_HOST, port: int = SERVE_PORT, workers: int = FEED_WORKERS) -> None:
+    # HTTP on a background thread; the main thread polls feeds as they come due and decodes what's new
+    httpd = ThreadingHTTPServer((host, port), make_handler(service))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="serve-http", daemon=True).start()
+    print(f"Serving http://{host}:{httpd.server_port} (/results, /status) for {len(service.feeds)} feeds")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            while True:
+                try:
+                    n = service.poll(pool)
+                except Exception as exc:
+                    # the service keeps going; the next poll picks up whatever this one didn't finish
+                    delay = service.poll_failed(exc)
+                    print(f"{datetime.now().strftime('%H:%M:%S')} poll failed, retrying in {delay:.0f}s", file=sys.stderr)
+                    traceback.print_exc()
+                    time.sleep(delay); continue
+                service.error_streak = 0
+                if n: print(f"{datetime.now().strftime('%H:%M:%S')} decoded {n} new entries ({len(service.results)} held)")
+                time.sleep(min(30.0, max(1.0, service.next_due() - time.time())))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.shutdown(); service.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="keep decoding the feeds as they update and serve the latest results over HTTP")
+    ap.add_argument("--host", type=str, default=SERVE_HOST)
+    ap.add_argument("--port", type=int, default=SERVE_PORT)
+    ap.add_argument("--days", type=int, default=DEFAULT_LOOKBACK_DAYS, help="lookback window kept in memory")
+    ap.add_argument("--feeds", type=str, nargs="+", default=RSS_FEEDS)
+    ap.add_argument("--db", type=str, default="database/phrases.json")
+    ap.add_argument("--archetypes", type=str, default="database/archetypes.json")
+    ap.add_argument("--cache", type=str, default=ARTICLE_CACHE_PATH, help="article cache path ('' disables)")
+    ap.add_argument("--ledger", type=str, default=LEDGER_PATH, help="processed-articles ledger path ('' disables)")
+    ap.add_argument("--archive", type=str, default=ARCHIVE_PATH, help="archive of decoded articles across runs ('' disables)")
+    ap.add_argument("--fuzzy", action="store_true", default=FUZZY_MATCHING, help="also match phrases to DB phrases by text (rapidfuzz)")
+    ap.add_argument("--keep-duplicates", action="store_true", help="decode every copy of a story carried by several feeds")
+    ap.add_argument("--max-results", type=int, default=SERVE_MAX_RESULTS)
+    args = ap.parse_args()
+    serve(DecodeService(args.feeds, days=args.days, db_path=args.db, archetypes_path=args.archetypes, cache_path=args.cache,
+                        ledger_path=args.ledger, archive_path=args.archive, fuzzy=args.fuzzy,
+                        near_dups=NEAR_DUPLICATES and not args.keep_duplicates, max_results=args.max_results),
+          host=args.host, port=args.port)
@@ -0,0 +1,42 @@
+import random
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+PHRASES, ARCHETYPES = str(ROOT / "database" / "phrases.json"), str(ROOT / "database" / "archetypes.json")
+
+def _model_available() -> bool:
+    # spacy.load takes an installed package or a path to a saved pipeline
+    try:
+        import spacy
+        from src.config import NLP_MODEL
+    except ImportError:
+        return False
+    return spacy.util.is_package(NLP_MODEL) or Path(NLP_MODEL).is_dir()
+
+requires_model = pytest.mark.skipif(not _model_available(), reason="the spaCy model isn't installed")
+
+_WORDS = ("king queen crown river storm fire water council minister market election court harbor bridge "
+          "festival senate union budget treaty border summit tower garden lantern").split()
+
+def article_text(seed: int, n: int = 80) -> str:
+    r = random.Random(seed)
+    return " ".join(r.choice(_WORDS).capitalize() if k % 9 == 0 else r.choice(_WORDS) for k in range(n)) + "."
+
+@pytest.fixture
+def entries():
+    # feed entries over three hosts; 4 and 7 carry story 0 again, 9 carries story 2
+    return [{"title": f"Headline {i} of 33 kings", "link": f"http://h{i % 3}.test/a{i}",
+             "published": f"2024-10-{10 + i:02d}T08:30:00+00:00", "source": f"S{i % 3}"} for i in range(12)]
+
+@pytest.fixture
+def fake_fetch(monkeypatch):
+    # fetch_and_parse without the network; the article number picks the text, a.. with "fail" raises
+    import src.parse_article as pa
+    story = {4: 0, 7: 0, 9: 2}
+    def fetch(url):
+        if "fail" in url: raise ConnectionError(url)
+        i = int(url.rsplit("/a", 1)[1])
+        return {"title": f"Headline {i} of 33 kings", "text": article_text(story.get(i, i)), "published": None, "authors": []}
+    monkeypatch.setattr(pa, "fetch_and_parse", fetch)
+    return fetch
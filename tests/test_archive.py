@@ -0,0 +1,32 @@
+import json, subprocess, sys
+import pytest
+from src.archive import Archive
+from src.report import write_json, write_timings
+from conftest import ROOT
+
+def _report(outdir, n):
+    items = [{"link": f"http://h.test/a{i}", "title": f"T{i}", "source": "S", "published": "2024-10-11T08:30:00+00:00",
+              "matches": [{"phrase": "king", "db_phrase": "king", "calculator": "english_ordinal", "value": 41}],
+              "patterns": {"score": i, "archetype_hits": ["king"], "archetype_counts": {"king": 1}}} for i in range(n)]
+    path = write_json(iter(items), str(outdir))
+    write_timings({"stages": {}, "total_wall_s": 0.1, "bottleneck": None}, path)
+    return path
+
+def test_ingest_report_refuses_a_timings_sidecar(tmp_path):
+    path = _report(tmp_path, 3)
+    arc = Archive(str(tmp_path / "a.sqlite"))
+    assert arc.ingest_report(path) == 3
+    with pytest.raises(ValueError):
+        arc.ingest_report(path.replace(".json", ".timings.json"))
+    assert len(arc) == 3
+    arc.close()
+
+def test_ingest_cli_skips_sidecars_and_bad_files(tmp_path):
+    _report(tmp_path, 2)
+    (tmp_path / "report-broken.json").write_text('[{"link":')
+    res = subprocess.run([sys.executable, "-m", "src.archive", "--archive", str(tmp_path / "a.sqlite"), "ingest",
+                          str(tmp_path / "report-*.json")], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert res.returncode == 0, res.stderr
+    assert "timings" not in res.stdout + res.stderr
+    assert "report-broken.json: skipped" in res.stderr
+    assert "(2 articles), 1 file(s) skipped" in res.stdout
@@ -0,0 +1,39 @@
+import sqlite3, threading
+import pytest
+from src.pipeline import Pipeline
+from conftest import PHRASES, ARCHETYPES, requires_model
+
+def _run(entries, **kw):
+    p = Pipeline(PHRASES, ARCHETYPES, fuzzy=False, **kw)
+    return [(e["link"], item) for e, item in p.run(entries)], p.timings()
+
+@requires_model
+@pytest.mark.parametrize("chunk", [3, 64])
+def test_overlapped_matches_batch(entries, fake_fetch, chunk):
+    entries[5]["link"] = "http://h2.test/fail/a5"
+    batch, bt = _run(entries, procs=1, chunk=chunk)
+    overlapped, ot = _run(entries, procs=2, chunk=chunk)
+    assert overlapped == batch
+    assert [link.rsplit("/", 1)[1] for link, _ in batch] == [f"a{i}" for i in range(12) if i != 5]
+    dups = {link.rsplit("/", 1)[1]: it["duplicate_of"].rsplit("/", 1)[1] for link, it in batch if "duplicate_of" in it}
+    assert dups == {"a4": "a0", "a7": "a0", "a9": "a2"}
+    for t in (bt, ot):
+        assert t["stages"]["fetch"]["items"] == 12 and t["stages"]["fetch"]["failures"] == 1
+
+class _LockedCache:
+    # an ArticleCache whose database is locked by another writer
+    def get(self, url): raise sqlite3.OperationalError("database is locked")
+    def put(self, url, parsed): pass
+    def decoded(self, key, decoder): return None
+    def put_decoded(self, key, decoder, parts): pass
+    def flush(self): pass
+
+@pytest.mark.parametrize("procs", [1, 2])
+def test_fetch_failure_is_raised_not_hung(entries, fake_fetch, procs):
+    out = {}
+    def consume():
+        try: out["items"] = list(Pipeline(PHRASES, ARCHETYPES, fuzzy=False, procs=procs, chunk=4, cache=_LockedCache()).run(entries))
+        except Exception as exc: out["error"] = exc
+    t = threading.Thread(target=consume, daemon=True); t.start(); t.join(120)
+    assert not t.is_alive(), "the run hung after its fetch failed"
+    assert isinstance(out.get("error"), sqlite3.OperationalError)
@@ -0,0 +1,38 @@
+import json, pickle
+import pytest
+from src.pipeline import Pipeline
+from src.report import write_json
+from src.result_model import CompactResult, compact, expand
+from conftest import PHRASES, ARCHETYPES, article_text
+
+@pytest.fixture(scope="module")
+def items():
+    # pipeline result dicts, decoded from made-up 5W output so no model is needed
+    p = Pipeline(PHRASES, ARCHETYPES, procs=1, fuzzy=False)
+    out = []
+    for i in range(4):
+        e = {"title": f"King of the 33rd river {i}", "link": f"http://h.test/a{i}", "source": "S"}
+        text = article_text(i)
+        five_w = {"who": ["The King"], "what": ["river"], "when_mentions": [], "when_parsed": [], "where": ["Rome"], "why": None}
+        phrases = ["the king", "river of fire", f"crown {i}", "queen", "the king"]
+        out.append(p.decode(e, {"authors": ["A. Writer"]}, e["title"], text, "2024-10-11T08:30:00+00:00", five_w, phrases,
+                            keep_text=200 * (i % 2), duplicate_of="http://h.test/a0" if i == 3 else None))
+    # results that don't fit the compact arrays are kept as they are
+    out.append({"link": "http://h.test/odd", "title": None, "phrases": ["a", 1], "values": {"a": {"x": 1.5}},
+                "matches": [{"phrase": "a"}], "extra": {"nested": [1, [2, 3]]}, "text": None})
+    return out
+
+def test_compact_result_round_trip(items):
+    for it in items:
+        c = CompactResult.from_dict(it)
+        assert c.to_dict() == it and list(c.to_dict()) == list(it)
+        for k in it: assert c[k] == it[k], k
+        assert c.get("missing") is None and c.has_matches == bool(it.get("matches"))
+        assert pickle.loads(pickle.dumps(c)).to_dict() == it
+    assert list(expand(compact(items))) == items
+
+def test_write_json_streams_the_same_file_as_json_dumps(items, tmp_path):
+    got = write_json(expand(compact(items)), str(tmp_path))  # a generator, written one item at a time
+    assert open(got, encoding="utf-8").read() == json.dumps(items, ensure_ascii=False, indent=2)
+    (tmp_path / "empty").mkdir()
+    assert open(write_json(iter(()), str(tmp_path / "empty"))).read() == "[]"
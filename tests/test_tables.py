@@ -0,0 +1,55 @@
+import re
+from datetime import date, datetime, timedelta
+import pytest
+from src.astrology import basic_astrology
+from src.calendar_table import CalendarTable
+from src.gematria import CALC_FUNCS
+from src.numerology import date_numerology
+from src.patterns import ArchetypeMatcher, archetype_hits, load_archetypes
+from conftest import ARCHETYPES
+
+def test_calendar_matches_direct_computation():
+    cal = CalendarTable(date(1999, 12, 1), date(2001, 3, 31))
+    d = date(1999, 11, 25)  # a week before the table starts, through the day after it ends
+    while d <= date(2001, 4, 1):
+        dt = datetime(d.year, d.month, d.day, 13, 5)
+        assert cal.numerology(dt) == date_numerology(dt), d
+        assert cal.astrology(dt) == basic_astrology(dt), d
+        d += timedelta(days=1)
+
+def test_calendar_find_matches_a_scan():
+    cal = CalendarTable(date(2024, 1, 1), date(2024, 12, 31))
+    days = [date(2024, 1, 1) + timedelta(days=k) for k in range(366)]
+    want = [d for d in days if date_numerology(d)['life_path'] == 11 and basic_astrology(d)['sun_sign'] == 'Leo']
+    assert cal.find(life_path=11, sun_sign='Leo') == want
+    assert cal.find(master_day=True, since=date(2024, 3, 1), limit=3) == [date(2024, 3, 11), date(2024, 3, 22), date(2024, 4, 11)]
+
+def _reference(s: str, weight) -> int:
+    # the per-letter definition the byte tables replaced
+    return sum(weight(ord(ch) - 64) for ch in re.sub(r"[^A-Za-z]", "", s).upper())
+
+@pytest.mark.parametrize("name, weight", [
+    ("english_ordinal", lambda n: n), ("full_reduction", lambda n: (n - 1) % 9 + 1),
+    ("reverse_ordinal", lambda n: 27 - n), ("reverse_reduction", lambda n: (26 - n) % 9 + 1),
+    ("sumerian", lambda n: 6 * n)])
+def test_gematria_tables_match_letter_sums(name, weight):
+    for s in ["Hello World", "", "123 !?", "Ünïcödé café", "Zz-Aa", "the KING'S crown, 2024"]:
+        assert CALC_FUNCS[name](s) == _reference(s, weight), s
+
+def _naive_scan(text, archetypes):
+    # each archetype on its own, as archetype_hits used to: \b...\b in the lowercased text, overlaps included
+    t, out = text.lower(), {}
+    for w in archetypes:
+        if len(w) < 3 or w in out: continue
+        pos = [m.start() for m in re.finditer(rf"(?=\b{re.escape(w.lower())}\b)", t)]
+        if pos: out[w] = pos
+    return out
+
+def test_archetype_matcher_matches_per_archetype_regexes():
+    words = load_archetypes(ARCHETYPES) + ["sun king", "King", "new moon", "moonlight", "ox", "star-crossed"]
+    m = ArchetypeMatcher(words)
+    texts = ["The Sun King met the new moon by moonlight; a star-crossed lover.",
+             "kingdom kings KING king. Suns sun-king", "", "stars, starship, star."]
+    for t in texts:
+        assert m.scan(t) == _naive_scan(t, words), t
+        assert archetype_hits(t, words) == list(_naive_scan(t, words))[:20]